@@ -3,128 +3,483 @@
 arXiv论文爬取机器人主程序
 """
 
+import argparse
 import os
 import sys
 import logging
-import time
-from dotenv import load_dotenv
+from datetime import timedelta
+from contextlib import contextmanager
+from functools import cached_property
+from typing import Callable, Optional
 
-# 导入自定义模块
-from utils.arxiv_crawler import ArxivCrawler
-from utils.paper_filter import PaperFilter
-from utils.ai_summarizer import AISummarizer
-from utils.email_sender import EmailSender
-from configs import config
+# 启动时只导入轻量模块；爬虫、筛选、AI总结和邮件等组件在首次使用时才导入和创建，
+# help、status 等命令不加载 requests/feedparser，也不需要邮箱凭据
+from utils.paper_utils import paper_id, paper_version, utc_now
+from utils.checkpoint import RunCheckpoint
+from utils.metrics import metrics
+from utils.outbox import Outbox
+from utils.scheduler import RunLock
+from utils.profiles import load_profile, profile_name, profile_paths, validate_config
+from utils.spool import PaperSpool
 
-# 加载环境变量
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# 配置日志
-from utils.logger import setup_logger
 
-log_path = os.path.join("logs", os.getenv("LOG_FILE", "arxiv_robot.log"))
-os.makedirs(os.path.dirname(log_path), exist_ok=True)
+def crawl_buffer(cfg, state_dir: str):
+    """爬取结果缓冲：超过 CRAWL_MEMORY_LIMIT_MB 后转存到 <state_dir>/spool，为0时全部留在内存中"""
+    limit = getattr(cfg, 'CRAWL_MEMORY_LIMIT_MB', 256)
+    if not limit:
+        return []
+    return PaperSpool(memory_limit=int(limit * 1024 * 1024), spill_dir=os.path.join(state_dir, 'spool'))
 
-# 使用新的日志系统
-setup_logger(os.getenv("LOG_LEVEL", "INFO"))
-logger = logging.getLogger(__name__)
+
+def release(papers):
+    """释放爬取结果缓冲占用的临时文件"""
+    if isinstance(papers, PaperSpool):
+        papers.close()
 
 
 class ArxivRobot:
     """arXiv论文爬取机器人"""
     
-    def __init__(self):
-        # 验证配置
-        self._validate_config()
+    def __init__(self, cfg=None, name: Optional[str] = None,
+                 summarizer_provider: Optional[Callable] = None, state_dir: Optional[str] = None):
+        # cfg 为配置模块，默认使用 configs/config.py；
+        # 多配置运行时通过 summarizer_provider 取得共享的 AISummarizer
+        if cfg is None:
+            from configs import config as cfg
+        self.config = cfg
+        self.name = name or 'default'
+        self._summarizer_provider = summarizer_provider
+        self._env_recipients = [e.strip() for e in os.getenv('RECIPIENT_EMAIL', '').split(',') if e.strip()]
+        
+        state_dir = state_dir or getattr(self.config, 'STATE_DIR', 'output')
         
+        # 流水线模式：sequential（顺序执行）或 streaming（流式并发）
+        self.pipeline_mode = getattr(self.config, 'PIPELINE_MODE', 'sequential')
+        
+        # 检查点：每个阶段的输出按运行ID保存，失败后可从断点恢复
+        self.checkpoint_enabled = getattr(self.config, 'CHECKPOINT_ENABLED', True)
+        self.runs_dir = os.path.join(state_dir, 'runs')
+        self.state_dir = state_dir
+        self.run_lock = RunLock(os.path.join(state_dir, 'run.lock'))
+        
+        # 运行指标：每次运行结束写入JSON报告和 Prometheus 文本文件
+        self.metrics_dir = os.path.join(state_dir, 'metrics') if getattr(self.config, 'METRICS_ENABLED', True) else None
+        
+        # 已发送台账：跨天跳过已推送过的论文
+        self.skip_sent_papers = getattr(self.config, 'SKIP_SENT_PAPERS', True)
+        
+        # 发件箱：渲染好的邮件先落盘，发送失败只需重试发送
+        self.outbox = Outbox(
+            outbox_dir=os.path.join(state_dir, 'outbox'),
+            max_attempts=int(os.getenv('EMAIL_MAX_ATTEMPTS', 5)),
+            retry_delay=float(os.getenv('EMAIL_RETRY_DELAY', 30)),
+            on_sent=lambda sent: self.ledger.record(sent),
+        )
+    
+    def log_config(self):
+        """输出配置信息"""
         logger.info('\n\n'+"=" * 50)
-        logger.info("📋 配置信息:")
-        logger.info(f"  - arXiv类别: {len(config.ARXIV_CATEGORIES)} 个")
-        logger.info(f"  - arXiv类别: \n{config.ARXIV_CATEGORIES}")
-        logger.info(f"  - 每类爬取上限: {config.MAX_PAPERS_PER_CATEGORY} 篇")
-        logger.info(f"  - 每组精选论文上限: {config.MAX_PAPERS_PER_GROUP} 篇")
-        logger.info(f"  - 爬取天数: {config.DAYS_BACK} 天")
-        logger.info(f"  - 筛选关键词组: {len(config.KEYWORDS)} 个")
-        logger.info(f"  - 关键词组: \n{config.KEYWORDS}")
-        logger.info(f"  - 排除全局关键词: {len(config.GLOBAL_EXCLUDE_KEYWORDS)} 个")
-        logger.info(f"  - 排除全局关键词: \n{config.GLOBAL_EXCLUDE_KEYWORDS}")
+        logger.info(f"📋 配置信息 ({self.name}):")
+        logger.info(f"  - arXiv类别: {len(self.config.ARXIV_CATEGORIES)} 个")
+        logger.info(f"  - arXiv类别: \n{self.config.ARXIV_CATEGORIES}")
+        logger.info(f"  - 每类爬取上限: {self.config.MAX_PAPERS_PER_CATEGORY} 篇")
+        logger.info(f"  - 每组精选论文上限: {self.config.MAX_PAPERS_PER_GROUP} 篇")
+        logger.info(f"  - 爬取天数: {self.config.DAYS_BACK} 天")
+        logger.info(f"  - 筛选关键词组: {len(self.config.KEYWORDS)} 个")
+        logger.info(f"  - 关键词组: \n{self.config.KEYWORDS}")
+        logger.info(f"  - 排除全局关键词: {len(self.config.GLOBAL_EXCLUDE_KEYWORDS)} 个")
+        logger.info(f"  - 排除全局关键词: \n{self.config.GLOBAL_EXCLUDE_KEYWORDS}")
 
         logger.info(f"  - 模型类型: {os.getenv('MODEL_TYPE')}")
         logger.info(f"  - 是否启用思考: {os.getenv('ENABLE_THINKING')}")
         logger.info(f"  - 是否启用AI总结: {os.getenv('USE_AI_SUMMARY')}")
 
         logger.info(f"  - 邮件接收人: \n{os.getenv('RECIPIENT_EMAIL')}")
+        logger.info(f"  - 订阅人数: {len(self.subscriptions)}")
         logger.info("=" * 50+"\n")
-        
-        # 初始化组件
-        self.crawler = ArxivCrawler(
-            categories=config.ARXIV_CATEGORIES,
-            max_papers_per_category=config.MAX_PAPERS_PER_CATEGORY
+    
+    # 以下组件在首次使用时创建
+    
+    @cached_property
+    def crawler(self):
+        from utils.arxiv_crawler import ArxivCrawler
+        return ArxivCrawler(
+            categories=self.config.ARXIV_CATEGORIES,
+            max_papers_per_category=self.config.MAX_PAPERS_PER_CATEGORY
         )
+    
+    @cached_property
+    def filter(self):
+        from utils.paper_filter import PaperFilter
         
-        self.filter = PaperFilter(
-            keywords=config.KEYWORDS,
-            global_keywords=config.GLOABL_KEYWORDS,
-            global_exclude_keywords=config.GLOBAL_EXCLUDE_KEYWORDS,
+        # 筛选缓存：论文和关键词组都没变时复用上次的匹配结果
+        filter_cache = None
+        if getattr(self.config, 'FILTER_CACHE_ENABLED', True):
+            from utils.filter_cache import FilterCache
+            # 移出爬取窗口的论文不会再被筛选，多保留一天以免窗口边界上的论文被过早删除
+            filter_cache = FilterCache(os.path.join(self.state_dir, 'filter_cache.sqlite'),
+                                       retention_days=self.config.DAYS_BACK + 1)
+        
+        return PaperFilter(
+            keywords=self.config.KEYWORDS,
+            global_keywords=self.config.GLOABL_KEYWORDS,
+            global_exclude_keywords=self.config.GLOBAL_EXCLUDE_KEYWORDS,
+            cache=filter_cache,
+        )
+    
+    @cached_property
+    def ai_summarizer(self):
+        if self._summarizer_provider is not None:
+            return self._summarizer_provider()
+        from utils.ai_summarizer import AISummarizer
+        return AISummarizer()
+    
+    @cached_property
+    def fulltext(self):
+        """全文提取（FULLTEXT_ENABLED），未开启时为None"""
+        if not getattr(self.config, 'FULLTEXT_ENABLED', False):
+            return None
+        from utils.fulltext import FullTextExtractor
+        return FullTextExtractor(
+            url_template=getattr(self.config, 'FULLTEXT_PDF_URL', 'https://arxiv.org/pdf/{arxiv_id}{version}'),
+            cache_dir=os.path.join(self.state_dir, 'fulltext'),
+            workers=getattr(self.config, 'FULLTEXT_WORKERS', 2),
+            max_chars=getattr(self.config, 'FULLTEXT_MAX_CHARS', 6000),
+            wait=getattr(self.config, 'FULLTEXT_WAIT', 30),
+        )
+    
+    @cached_property
+    def archive(self):
+        """论文归档与全文索引（ARCHIVE_ENABLED），未开启时为None"""
+        if not getattr(self.config, 'ARCHIVE_ENABLED', True):
+            return None
+        from utils.archive import PaperArchive
+        return PaperArchive(os.path.join(self.state_dir, 'archive.sqlite'))
+    
+    @cached_property
+    def near_duplicates(self):
+        """近似重复检测（NEAR_DUPLICATE_ENABLED），未开启时为None"""
+        if not getattr(self.config, 'NEAR_DUPLICATE_ENABLED', True):
+            return None
+        from utils.near_duplicates import NearDuplicateIndex
+        return NearDuplicateIndex(
+            os.path.join(self.state_dir, 'near_duplicates.sqlite'),
+            threshold=getattr(self.config, 'NEAR_DUPLICATE_THRESHOLD', 0.8),
+            retention_days=getattr(self.config, 'NEAR_DUPLICATE_RETENTION_DAYS', 180),
+        )
+    
+    def _collapse_duplicates(self, filtered_papers: dict) -> dict:
+        """每簇近似重复论文只保留一篇代表论文，检测失败时原样返回"""
+        if self.near_duplicates is None:
+            return filtered_papers
+        try:
+            with metrics.stage('near_dup'):
+                return self.near_duplicates.collapse(filtered_papers)
+        except Exception as e:
+            logger.warning(f"⚠️ 近似重复检测失败，跳过: {e}")
+            return filtered_papers
+    
+    def _duplicate_tracker(self):
+        """流式模式预先总结前的近似重复检测，未开启时为None"""
+        if self.near_duplicates is None:
+            return None
+        from utils.near_duplicates import DuplicateTracker
+        return DuplicateTracker(self.near_duplicates.threshold)
+    
+    def _archive(self, method: str, *args):
+        """写入归档，失败时只记录警告，不影响本次运行"""
+        if self.archive is None:
+            return
+        try:
+            getattr(self.archive, method)(*args)
+        except Exception as e:
+            logger.warning(f"⚠️ 写入论文归档失败: {e}")
+    
+    @cached_property
+    def email_sender(self):
+        # 只有需要发信时才检查邮箱凭据
+        self._validate_config()
+        from utils.email_sender import EmailSender
+        return EmailSender(
+            max_paper_per_group=self.config.MAX_PAPERS_PER_GROUP
+        )
+    
+    @cached_property
+    def subscriptions(self) -> list:
+        return self._load_subscriptions()
+    
+    @cached_property
+    def ledger(self):
+        from utils.sent_ledger import SentLedger
+        return SentLedger(
+            path=os.path.join(self.state_dir, 'sent_ledger.json'),
+            retention_days=getattr(self.config, 'SENT_LEDGER_RETENTION_DAYS', 30),
         )
+    
+    @property
+    def config_path(self) -> Optional[str]:
+        """当前配置文件路径"""
+        path = getattr(self.config, '__file__', None)
+        return os.path.abspath(path) if path else None
+    
+    def config_paths(self) -> list:
+        return [self.config_path] if self.config_path else []
+    
+    def _load_subscriptions(self) -> list:
+        """根据当前配置生成订阅"""
+        from utils.subscription import load_subscriptions
         
-        self.ai_summarizer = AISummarizer()
-        self.email_sender = EmailSender(
-            max_paper_per_group=config.MAX_PAPERS_PER_GROUP
+        # 配置文件中可以为该配置单独指定收件人
+        if getattr(self.config, 'RECIPIENT_EMAIL', None):
+            self.email_sender.recipient_emails = list(self.config.RECIPIENT_EMAIL)
+        else:
+            self.email_sender.recipient_emails = list(self._env_recipients)
+        
+        # 订阅：未单独配置的收件人默认订阅全部关键词组
+        return load_subscriptions(
+            recipients=self.email_sender.recipient_emails,
+            subscriptions=getattr(self.config, 'SUBSCRIPTIONS', {}),
+            all_groups=list(self.config.KEYWORDS.keys()),
+            default_max_papers=self.config.MAX_PAPERS_PER_GROUP,
         )
     
+    def reload_config(self, path: str, cfg) -> bool:
+        """热加载配置：只重新编译变化的关键词组
+
+        配置无效或应用失败时抛出 ValueError 并保留旧配置；任务运行中时返回False，稍后重试
+        """
+        # 先完整校验，不通过时不改动任何组件；热加载绝不退出进程
+        errors = validate_config(cfg) + [f"缺少必需配置: {var}" for var in self._missing_env(cfg)]
+        if errors:
+            raise ValueError(f"配置 {self.name} 无效: {'; '.join(errors)}")
+        if not self.run_lock.acquire():
+            return False
+        try:
+            old_config = self.config
+            components = ('crawler', 'email_sender', 'subscriptions', 'fulltext', 'near_duplicates')
+            old_components = {name: self.__dict__[name] for name in components if name in self.__dict__}
+            try:
+                self.config = cfg
+                changed = self.filter.update(
+                    keywords=cfg.KEYWORDS,
+                    global_keywords=getattr(cfg, 'GLOABL_KEYWORDS', []),
+                    global_exclude_keywords=cfg.GLOBAL_EXCLUDE_KEYWORDS,
+                )
+                # 其余组件按新配置在下次使用时重新创建
+                for component in components:
+                    self.__dict__.pop(component, None)
+                subscriptions = len(self.subscriptions)
+            except Exception as e:
+                self.config = old_config
+                self.filter.update(
+                    keywords=old_config.KEYWORDS,
+                    global_keywords=getattr(old_config, 'GLOABL_KEYWORDS', []),
+                    global_exclude_keywords=old_config.GLOBAL_EXCLUDE_KEYWORDS,
+                )
+                for component in components:
+                    self.__dict__.pop(component, None)
+                self.__dict__.update(old_components)
+                raise ValueError(f"应用配置 {self.name} 失败: {e}") from e
+            self.pipeline_mode = getattr(cfg, 'PIPELINE_MODE', 'sequential')
+            self.skip_sent_papers = getattr(cfg, 'SKIP_SENT_PAPERS', True)
+            logger.info(f"配置 {self.name} 已更新: {len(changed)}/{len(cfg.KEYWORDS)} 个关键词组重新编译, 订阅人数 {subscriptions}")
+            return True
+        finally:
+            self.run_lock.release()
+    
+    @staticmethod
+    def _missing_env(cfg) -> list:
+        """缺少的必需环境变量"""
+        required_vars = ['EMAIL_USER', 'EMAIL_PASSWORD']
+        if not getattr(cfg, 'RECIPIENT_EMAIL', None):
+            required_vars.append('RECIPIENT_EMAIL')
+        return [var for var in required_vars if not os.getenv(var)]
+    
     def _validate_config(self):
         """验证配置"""
-        required_vars = ['EMAIL_USER', 'EMAIL_PASSWORD', 'RECIPIENT_EMAIL']
-        missing_vars = [var for var in required_vars if not os.getenv(var)]
+        missing_vars = self._missing_env(self.config)
         
         if missing_vars:
             logger.error(f"缺少必需配置: {', '.join(missing_vars)}")
             logger.error("请检查 .env 文件")
             sys.exit(1)
     
-    def run(self) -> bool:
-        """运行机器人"""
+    def run(self, run_id: Optional[str] = None, deliver: bool = True, shared_papers: Optional[list] = None) -> bool:
+        """运行机器人；run_id 为已有运行时从其第一个未完成的阶段恢复，deliver=False 时只准备到总结完成
+
+        shared_papers 为多配置运行时共享的爬取结果（列表或 PaperSpool），传入时不再单独爬取
+        """
+        if not self.run_lock.acquire():
+            logger.warning("⚠️ 已有任务正在运行，本次跳过")
+            return False
+        try:
+            run_id = run_id or RunCheckpoint.new_run_id()
+            with metrics.run(run_id, self.metrics_dir):
+                success = self._run(run_id, deliver, shared_papers)
+                metrics.set('run_success', int(success))
+                return success
+        finally:
+            self.run_lock.release()
+    
+    def _run(self, run_id: Optional[str], deliver: bool, shared_papers: Optional[list]) -> bool:
+        checkpoint = RunCheckpoint(self.runs_dir, run_id, enabled=self.checkpoint_enabled)
         try:
-            logger.info("开始执行arXiv论文爬取任务...")
+            if checkpoint.resumed:
+                logger.info(f"从检查点恢复运行 {checkpoint.run_id}，从阶段 {checkpoint.first_incomplete()} 开始...")
+            else:
+                logger.info(f"开始执行arXiv论文爬取任务 (运行ID: {checkpoint.run_id})...")
             
-            # 1. 爬取论文
-            logger.info('\n'+"=" * 50)
-            logger.info(f"📥 步骤1: 爬取论文 (最近{config.DAYS_BACK}天)")
-            try:
-                papers = self.crawler.fetch_papers(days_back=config.DAYS_BACK)
+            filtered_papers = checkpoint.load('filter')
+            if filtered_papers is not None:
+                logger.info("⏩ 步骤1-2: 使用检查点中的筛选结果")
+            elif self.pipeline_mode == 'streaming' and shared_papers is None and not checkpoint.has('crawl'):
+                # 1-2. 流式爬取、筛选，并预先总结高分论文；多配置运行恢复时已有共享爬取的检查点，不再重新爬取
+                logger.info('\n'+"=" * 50)
+                logger.info(f"🌊 步骤1-2: 流式爬取并筛选论文 (最近{self.config.DAYS_BACK}天)")
+                try:
+                    filtered_papers = self._collapse_duplicates(self._stream_filtered_papers())
+                    checkpoint.save('filter', filtered_papers)
+                except Exception as e:
+                    logger.error(f"❌ 流式爬取筛选失败: {e}")
+                    return False
+            else:
+                # 1. 爬取论文
+                papers = checkpoint.load_items('crawl', crawl_buffer(self.config, self.state_dir))
+                if papers is not None:
+                    logger.info(f"⏩ 步骤1: 使用检查点中的爬取结果 ({len(papers)} 篇论文)")
+                elif shared_papers is not None:
+                    papers = self.own_papers(shared_papers)
+                    checkpoint.save_items('crawl', papers)
+                    self._archive('add_papers', papers)
+                    logger.info(f"📥 步骤1: 使用共享爬取结果 ({len(papers)}/{len(shared_papers)} 篇论文属于本配置)")
+                else:
+                    logger.info('\n'+"=" * 50)
+                    logger.info(f"📥 步骤1: 爬取论文 (最近{self.config.DAYS_BACK}天)")
+                    try:
+                        papers = self.crawler.fetch_papers(
+                            days_back=self.config.DAYS_BACK, into=crawl_buffer(self.config, self.state_dir))
+                        checkpoint.save_items('crawl', papers)
+                        self._archive('add_papers', papers)
+                        logger.info(f"✅ 爬取完成: {len(papers)} 篇论文")
+                    except Exception as e:
+                        logger.error(f"❌ 爬取失败: {e}")
+                        return False
                 if not papers:
                     logger.warning("⚠️ 未获取到任何论文，任务终止")
+                    checkpoint.finish()
                     return True
-                logger.info(f"✅ 爬取完成: {len(papers)} 篇论文")
-            except Exception as e:
-                logger.error(f"❌ 爬取失败: {e}")
-                return False
+                
+                # 2. 筛选论文
+                logger.info("=" * 50)
+                logger.info(f"🔍 步骤2: 筛选论文 (关键词数量: {len(self.config.KEYWORDS)})")
+                try:
+                    with metrics.stage('filter'):
+                        filtered_papers = self.filter.filter_papers(
+                            papers, ai_summarizer=self.ai_summarizer,
+                            workers=getattr(self.config, 'FILTER_WORKERS', 1) or os.cpu_count() or 1,
+                            top_k=getattr(self.config, 'FILTER_TOP_K', 0) or None,
+                        )
+                    filtered_papers = self._collapse_duplicates(filtered_papers)
+                    checkpoint.save('filter', filtered_papers)
+                except Exception as e:
+                    logger.error(f"❌ 筛选失败: {e}")
+                    return False
+                finally:
+                    release(papers)
             
-            # 2. 筛选论文
-            logger.info("=" * 50)
-            # logger.info(f"🔍 步骤2: 筛选论文 (关键词数量: {len(config.KEYWORDS)}, 排除词: {len(config.EXCLUDE_KEYWORDS)})")
-            logger.info(f"🔍 步骤2: 筛选论文 (关键词数量: {len(config.KEYWORDS)})")
-            try:
-                filtered_papers = self.filter.filter_papers(papers, ai_summarizer=self.ai_summarizer)
-                if not filtered_papers:
-                    logger.info("⚠️ 未找到符合条件的论文，任务终止")
-                    return True
-                # logger.info(f"✅ 筛选完成: {len(filtered_papers)} 篇相关论文")
-                logger.info(f"✅ 筛选完成: {len([k for k, v in filtered_papers.items() if v])} 类相关论文")
-            except Exception as e:
-                logger.error(f"❌ 筛选失败: {e}")
-                return False
+            self._archive('add_matches', filtered_papers)
+            for group_name, group_papers in filtered_papers.items():
+                metrics.set('group_matches', len(group_papers), profile=self.name, group=group_name)
+            if not any(filtered_papers.values()):
+                logger.info("⚠️ 未找到符合条件的论文，任务终止")
+                checkpoint.finish()
+                return True
+            logger.info(f"✅ 筛选完成: {len([k for k, v in filtered_papers.items() if v])} 类相关论文")
+            
+            # 3. 总结论文（所有订阅共享，同一篇论文只总结一次）
+            selections = checkpoint.load('summarize')
+            if selections is not None:
+                logger.info("⏩ 步骤3: 使用检查点中的总结结果")
+                missing = [sub for sub in self.subscriptions if sub.email not in selections]
+                if missing and not checkpoint.has('render'):
+                    # 检查点保存后新增的订阅人：从筛选结果中为其选择并总结论文
+                    logger.info(f"📝 为检查点之后新增的 {len(missing)} 位订阅人选择论文")
+                    for sub in missing:
+                        selections[sub.email] = sub.select(filtered_papers, exclude_ids=self._excluded_ids(sub))
+                    self.ai_summarizer.summarize_papers([
+                        paper
+                        for sub in missing
+                        for group_papers in selections[sub.email].values()
+                        for paper in group_papers
+                    ])
+            else:
+                logger.info("=" * 50)
+                selections = self._select(filtered_papers)
+                selected_papers = [
+                    paper
+                    for selection in selections.values()
+                    for group_papers in selection.values()
+                    for paper in group_papers
+                ]
+                logger.info(f"📝 步骤3: 总结论文 ({len(self.subscriptions)} 个订阅)")
+                try:
+                    sections = None
+                    if self.fulltext is not None and self.ai_summarizer.use_ai_summary:
+                        # 后台提取待总结论文的全文，总结每篇论文时最多等待 FULLTEXT_WAIT 秒
+                        self.fulltext.prefetch([
+                            paper for paper in selected_papers
+                            if 'ai_summary' not in paper and paper_version(paper) not in self.ai_summarizer.summary_cache
+                        ])
+                        sections = self.fulltext.sections
+                    with metrics.stage('summarize'):
+                        summarized = self.ai_summarizer.summarize_papers(selected_papers, sections)
+                    checkpoint.save('summarize', selections)
+                    self._archive('add_summaries', selected_papers)
+                    logger.info(f"✅ 总结完成: {summarized} 篇论文")
+                except Exception as e:
+                    logger.error(f"❌ 总结失败: {e}")
+                    return False
+                finally:
+                    if self.fulltext is not None:
+                        self.fulltext.close()
+            
+            if not deliver:
+                # 邮件主题带日期，提前准备可能跨过零点，渲染留到发送时执行
+                logger.info(f"✅ 准备完成，{len(selections)} 位订阅人的论文等待渲染和发送")
+                return True
             
-            # 3. 总结论文并发送邮件
+            # 4. 按订阅渲染并发送邮件
             logger.info("=" * 50)
-            logger.info(f"📧 步骤3: 总结论文并发送邮件 (每个种类限制 {config.MAX_PAPERS_PER_GROUP} 篇)")
+            logger.info(f"📧 步骤4: 渲染并发送邮件")
             try:
-                success = self.email_sender.send_email(filtered_papers, ai_summarizer=self.ai_summarizer)
-                if success:
-                    logger.info(f"✅ 邮件发送完成")
-                    logger.info("=" * 50)
-                return success
+                digests = checkpoint.load('render')
+                if digests is not None:
+                    logger.info("⏩ 使用检查点中渲染好的邮件")
+                else:
+                    with metrics.stage('render'):
+                        digests = self._render(selections)
+                    checkpoint.save('render', digests)
+                
+                with metrics.stage('send'):
+                    if checkpoint.has('deliver'):
+                        # 邮件已写入发件箱，只重试未发送的部分
+                        sent, remaining = self.outbox.flush(self.email_sender, force=True)
+                        success = remaining == 0
+                    else:
+                        success = self._deliver(digests, selections)
+                        checkpoint.save('deliver', {'recipients': len(digests)})
+                
+                if not success:
+                    # 保持未完成状态，`resume` 会重试发件箱中未发送的邮件
+                    logger.warning(f"⚠️ 有邮件未发送，运行 {checkpoint.run_id} 保持未完成，可用 `python arxiv_robot.py resume` 重试")
+                    return False
+                checkpoint.finish()
+                RunCheckpoint.cleanup(self.runs_dir, keep=getattr(self.config, 'CHECKPOINT_KEEP_RUNS', 7))
+                logger.info(f"✅ 邮件发送完成")
+                logger.info("=" * 50)
+                return True
             except Exception as e:
                 logger.error(f"❌ 邮件发送失败: {e}")
                 logger.info("=" * 50)
@@ -135,74 +490,477 @@ class ArxivRobot:
             logger.info("=" * 50)
             return False
     
+    def resume(self, run_id: Optional[str] = None) -> bool:
+        """从检查点恢复运行，未指定 run_id 时恢复最近一次未完成的运行"""
+        run_id = run_id or RunCheckpoint.latest_incomplete(self.runs_dir)
+        if run_id is None:
+            logger.info("没有未完成的运行，无需恢复")
+            return True
+        if run_id not in RunCheckpoint.list_runs(self.runs_dir):
+            logger.error(f"❌ 找不到运行 {run_id} 的检查点")
+            return False
+        return self.run(run_id)
+    
+    def own_papers(self, papers):
+        """从共享爬取结果中取出属于本配置类别和时间窗口的论文"""
+        from utils.arxiv_crawler import ArxivCrawler
+        
+        categories = set(self.config.ARXIV_CATEGORIES)
+        cutoff = utc_now() - timedelta(days=self.config.DAYS_BACK)
+        own = crawl_buffer(self.config, self.state_dir)
+        own.extend(
+            paper for paper in papers
+            if categories & set(paper.get('categories', [])) and ArxivCrawler.published_after(paper, cutoff)
+        )
+        return own
+    
+    def _excluded_ids(self, sub) -> set:
+        """订阅人已收到过的论文"""
+        return self.ledger.seen(sub.email) if self.skip_sent_papers else set()
+    
+    def _stream_filtered_papers(self) -> dict:
+        """流式模式：爬取、去重、筛选和预先总结并发执行"""
+        from utils.pipeline import StreamingPipeline
+        
+        pipeline = StreamingPipeline(
+            crawler=self.crawler,
+            paper_filter=self.filter,
+            ai_summarizer=self.ai_summarizer,
+            subscriptions=self.subscriptions,
+            exclude_ids={sub.email: self._excluded_ids(sub) for sub in self.subscriptions},
+            days_back=self.config.DAYS_BACK,
+            queue_size=getattr(self.config, 'PIPELINE_QUEUE_SIZE', 1000),
+            summary_workers=getattr(self.config, 'SUMMARY_WORKERS', 4),
+            fulltext=self.fulltext if self.ai_summarizer.use_ai_summary else None,
+            on_page=lambda page: self._archive('add_papers', page),
+            duplicates=self._duplicate_tracker(),
+        )
+        return pipeline.run()
+    
+    def _select(self, filtered_papers: dict) -> dict:
+        """为每个订阅从共享筛选结果中选出论文"""
+        return {
+            sub.email: sub.select(filtered_papers, exclude_ids=self._excluded_ids(sub))
+            for sub in self.subscriptions
+        }
+    
+    def _render(self, selections: dict) -> list:
+        """按订阅渲染摘要，返回 [(收件人, 主题, 正文)]"""
+        rendered = {}
+        digests = []
+        for sub in self.subscriptions:
+            # 已发送台账会让同一订阅配置选出不同论文，因此按实际选中的论文判断能否共用渲染
+            selection = selections.get(sub.email)
+            if selection is None:
+                logger.warning(f"⚠️ {sub.email} 没有选中的论文，跳过")
+                continue
+            render_key = (sub.digest_key, tuple(
+                (group_name, tuple(paper_id(p) for p in group_papers))
+                for group_name, group_papers in selection.items()
+            ))
+            if render_key not in rendered:
+                rendered[render_key] = self.email_sender.render_digest(
+                    selection, self.ai_summarizer,
+                    max_papers=sub.max_papers_per_group,
+                )
+            subject, body = rendered[render_key]
+            digests.append((sub.email, subject, body))
+        logger.info(f"共渲染 {len(rendered)} 份摘要，发送给 {len(digests)} 位订阅人")
+        return digests
+    
+    def _deliver(self, digests: list, selections: dict) -> bool:
+        """写入发件箱并发送"""
+        self.outbox.enqueue(digests, paper_ids={
+            email: [paper_id(p) for group_papers in selection.values() for p in group_papers]
+            for email, selection in selections.items()
+        })
+        sent, remaining = self.outbox.flush(self.email_sender)
+        if remaining:
+            logger.warning(f"⚠️ {remaining} 封邮件发送失败，已保留在发件箱，运行 `python arxiv_robot.py resume` 或 `flush` 重试")
+        return remaining == 0
+    
     def test_email(self) -> bool:
         """测试邮件配置"""
         return self.email_sender.send_test_email()
+    
+    def flush_outbox(self) -> bool:
+        """重试发件箱中的待发邮件，不重新爬取、筛选和总结"""
+        pending = self.outbox.pending_count()
+        if not pending:
+            logger.info("发件箱为空，无需发送")
+            return True
+        logger.info(f"📮 发件箱中有 {pending} 封待发邮件，开始发送...")
+        _, remaining = self.outbox.flush(self.email_sender, wait=True, force=True)
+        return remaining == 0
+    
+    def search(self, query: str, since: Optional[str] = None, group: Optional[str] = None, limit: int = 20) -> bool:
+        """在本地论文归档中全文检索并输出结果，不访问网络"""
+        if self.archive is None:
+            print(f"[{self.name}] 未启用论文归档（ARCHIVE_ENABLED）")
+            return False
+        results = self.archive.search(query, since=since, group=group, limit=limit)
+        print(f"[{self.name}] 找到 {len(results)} 篇论文（归档共 {self.archive.count()} 篇）")
+        for i, paper in enumerate(results, 1):
+            groups = f"  [{', '.join(paper['groups'])}]" if paper['groups'] else ''
+            print(f"{i:>3}. {paper['title']}{groups}")
+            print(f"     {paper['arxiv_id']}{paper['version']}  {paper['published'][:10]}  {paper['link']}")
+            summary = paper['ai_summary']
+            if summary:
+                print(f"     核心问题：{summary.get('core_problem', '')}")
+                print(f"     关键思路：{summary.get('key_approach', '')}")
+                print(f"     主要结论：{summary.get('main_conclusion', '')}")
+            else:
+                print(f"     {paper['abstract'][:200]}...")
+        return True
+    
+    def status(self) -> bool:
+        """输出最近一次运行和发件箱状态，只读取状态文件；有未完成运行或待发邮件时返回False"""
+        runs = RunCheckpoint.list_runs(self.runs_dir)
+        pending = self.outbox.pending_count()
+        healthy = pending == 0
+        if runs:
+            checkpoint = RunCheckpoint(self.runs_dir, runs[-1])
+            finished = checkpoint.status['finished']
+            healthy = healthy and finished
+            print(f"[{self.name}] 最近运行: {checkpoint.run_id} "
+                  f"({'已完成' if finished else '未完成，下一阶段 ' + str(checkpoint.first_incomplete())})")
+        else:
+            print(f"[{self.name}] 最近运行: 无")
+        print(f"[{self.name}] 发件箱待发: {pending} 封")
+        return healthy
 
 
-def main():
-    """主函数"""
-    if len(sys.argv) > 1:
-        command = sys.argv[1].lower()
+class MultiProfileRobot:
+    """多配置机器人：所有配置共享一次去重爬取和同一份总结缓存，筛选和发送按配置分别执行"""
+    
+    def __init__(self, paths: list, state_dir: Optional[str] = None):
+        self.robots = []
+        for path in paths:
+            cfg = load_profile(path)
+            name = profile_name(path)
+            self.robots.append(ArxivRobot(
+                cfg, name=name, summarizer_provider=lambda: self.ai_summarizer,
+                state_dir=os.path.join(state_dir or getattr(cfg, 'STATE_DIR', 'output'), 'profiles', name),
+            ))
         
-        robot = ArxivRobot()
+        # 第一个配置提供定时等全局设置
+        self.config = self.robots[0].config
+        self.state_dir = state_dir or getattr(self.config, 'STATE_DIR', 'output')
+        self.checkpoint_enabled = all(robot.checkpoint_enabled for robot in self.robots)
+        self.run_lock = RunLock(os.path.join(self.state_dir, 'run.lock'))
         
-        if command == 'test':
-            logger.info("执行邮件配置测试...")
-            success = robot.test_email()
-            sys.exit(0 if success else 1)
-            
-        elif command == 'run':
-            logger.info("执行一次任务...")
-            success = robot.run()
-            sys.exit(0 if success else 1)
-            
-        elif command == 'help':
-            print("""
-arXiv论文爬取机器人使用说明:
+        self.days_back = max(robot.config.DAYS_BACK for robot in self.robots)
+    
+    def categories(self) -> list:
+        """所有配置类别的并集"""
+        categories = []
+        for robot in self.robots:
+            categories += [c for c in robot.config.ARXIV_CATEGORIES if c not in categories]
+        return categories
+    
+    def log_config(self):
+        for robot in self.robots:
+            robot.log_config()
+        logger.info(f"多配置运行: {[robot.name for robot in self.robots]}，共享爬取 {len(self.categories())} 个类别")
+    
+    @cached_property
+    def ai_summarizer(self):
+        # 共享的总结器：重叠论文只调用一次AI
+        from utils.ai_summarizer import AISummarizer
+        return AISummarizer()
+    
+    @cached_property
+    def crawler(self):
+        # 对所有配置类别的并集只爬取一次
+        from utils.arxiv_crawler import ArxivCrawler
+        return ArxivCrawler(
+            categories=self.categories(),
+            max_papers_per_category=max(robot.config.MAX_PAPERS_PER_CATEGORY for robot in self.robots),
+        )
+    
+    def run(self, run_id: Optional[str] = None, deliver: bool = True) -> bool:
+        """共享爬取一次，再依次执行每个配置的筛选、总结和发送"""
+        if not self.run_lock.acquire():
+            logger.warning("⚠️ 已有任务正在运行，本次跳过")
+            return False
+        try:
+            run_id = run_id or RunCheckpoint.new_run_id()
+            metrics_dir = os.path.join(self.state_dir, 'metrics') if getattr(self.config, 'METRICS_ENABLED', True) else None
+            with metrics.run(run_id, metrics_dir):
+                success = self._run(run_id, deliver)
+                metrics.set('run_success', int(success))
+                return success
+        finally:
+            self.run_lock.release()
+    
+    def _run(self, run_id: str, deliver: bool) -> bool:
+        # 所有配置都已有爬取或筛选检查点时不再爬取
+        need_crawl = False
+        for robot in self.robots:
+            checkpoint = RunCheckpoint(robot.runs_dir, run_id, enabled=robot.checkpoint_enabled)
+            if not (checkpoint.has('crawl') or checkpoint.has('filter') or checkpoint.status['finished']):
+                need_crawl = True
+        
+        papers = None
+        if need_crawl:
+            logger.info('\n'+"=" * 50)
+            logger.info(f"📥 共享爬取 (最近{self.days_back}天, {len(self.crawler.categories)} 个类别)")
+            try:
+                papers = self.crawler.fetch_papers(
+                    days_back=self.days_back, into=crawl_buffer(self.config, self.state_dir))
+                logger.info(f"✅ 共享爬取完成: {len(papers)} 篇论文")
+            except Exception as e:
+                logger.error(f"❌ 爬取失败: {e}")
+                return False
+        
+        results = []
+        try:
+            for robot in self.robots:
+                logger.info(f"▶️ 配置 {robot.name}")
+                results.append(robot.run(run_id, deliver=deliver, shared_papers=papers))
+        finally:
+            release(papers)
+        logger.info(f"总结缓存: {len(self.ai_summarizer.summary_cache)} 篇论文")
+        return all(results)
+    
+    def config_paths(self) -> list:
+        return [path for robot in self.robots for path in robot.config_paths()]
+    
+    def reload_config(self, path: str, cfg) -> bool:
+        """热加载某个配置文件，并更新共享爬取的类别并集；配置无效时抛出 ValueError"""
+        if not self.run_lock.acquire():
+            return False
+        try:
+            for robot in self.robots:
+                if robot.config_path == os.path.abspath(path) and not robot.reload_config(path, cfg):
+                    return False
+            self.__dict__.pop('crawler', None)
+            self.days_back = max(robot.config.DAYS_BACK for robot in self.robots)
+            self.config = self.robots[0].config
+            return True
+        finally:
+            self.run_lock.release()
+    
+    def resume(self, run_id: Optional[str] = None) -> bool:
+        """恢复最近一次未完成的运行"""
+        if run_id is None:
+            incomplete = [RunCheckpoint.latest_incomplete(robot.runs_dir) for robot in self.robots]
+            incomplete = [r for r in incomplete if r]
+            if not incomplete:
+                logger.info("没有未完成的运行，无需恢复")
+                return True
+            run_id = max(incomplete)
+        return self.run(run_id)
+    
+    def test_email(self) -> bool:
+        return all([robot.test_email() for robot in self.robots])
+    
+    def flush_outbox(self) -> bool:
+        return all([robot.flush_outbox() for robot in self.robots])
+    
+    def search(self, query: str, since: Optional[str] = None, group: Optional[str] = None, limit: int = 20) -> bool:
+        return all([robot.search(query, since, group, limit) for robot in self.robots])
+    
+    def status(self) -> bool:
+        return all([robot.status() for robot in self.robots])
+
+
+def create_robot(state_dir: Optional[str] = None):
+    """根据 CONFIG_PROFILES 创建单配置或多配置机器人；state_dir 覆盖配置中的 STATE_DIR"""
+    paths = profile_paths(os.getenv('CONFIG_PROFILES', ''))
+    if len(paths) > 1:
+        return MultiProfileRobot(paths, state_dir=state_dir)
+    if len(paths) == 1:
+        return ArxivRobot(load_profile(paths[0]), name=profile_name(paths[0]), state_dir=state_dir)
+    return ArxivRobot(state_dir=state_dir)
+
+
+@contextmanager
+def traffic_scope(args):
+    """run --record/--replay：录制或回放所有对外请求，使用与录制文件同名的独立状态目录，返回该目录"""
+    path = getattr(args, 'record', None) or getattr(args, 'replay', None)
+    if not path:
+        yield None
+        return
+    
+    from utils.replay import recording, replaying, reset_state_dir
+    state_dir = reset_state_dir(path)
+    scope = recording(path) if args.record else replaying(path, scale=args.replay_scale)
+    with scope:
+        yield state_dir
 
-python main.py test    - 测试邮件配置
-python main.py run     - 执行一次任务
-python main.py help    - 显示帮助信息
-python main.py         - 启动定时任务
 
+ENV_HELP = """
 环境变量配置 (.env 文件):
 - EMAIL_HOST: SMTP服务器地址
 - EMAIL_PORT: SMTP端口
 - EMAIL_USER: 发送邮箱
 - EMAIL_PASSWORD: 邮箱密码或应用密码
 - RECIPIENT_EMAIL: 接收邮箱
+- CONFIG_PROFILES: 多个配置文件（逗号分隔，可选，共享一次爬取和总结）
 - OPENAI_API_KEY: OpenAI API密钥 (可选，用于AI总结)
 - USE_AI_SUMMARY: 是否使用AI总结 (true/false)
-            """)
-            sys.exit(0)
+"""
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(
+        prog='arxiv_robot.py',
+        description='arXiv论文爬取机器人，不带子命令时启动定时任务',
+        epilog=ENV_HELP,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest='command', metavar='<command>')
+    commands.add_parser('daemon', help='启动定时任务（默认）')
+    run = commands.add_parser('run', help='执行一次任务')
+    traffic = run.add_mutually_exclusive_group()
+    traffic.add_argument('--record', metavar='FILE', help='录制本次运行的所有HTTP和SMTP交互到文件')
+    traffic.add_argument('--replay', metavar='FILE', help='离线回放录制文件，不访问网络')
+    run.add_argument('--replay-scale', type=float, default=1.0,
+                     help='回放耗时缩放比例：1 为录制时的耗时，0 为不等待（默认1）')
+    run.add_argument('--profile', action='store_true',
+                     help='按阶段采集CPU和内存剖析，写入 output/profiling/<运行ID>/')
+    run.add_argument('--profile-top', type=int, default=20, metavar='N', help='剖析报告中列出的函数和分配数（默认20）')
+    commands.add_parser('test', help='测试邮件配置')
+    commands.add_parser('flush', help='重试发件箱中发送失败的邮件')
+    resume = commands.add_parser('resume', help='从检查点恢复未完成的任务（默认最近一次）')
+    resume.add_argument('run_id', nargs='?', help='运行ID，默认最近一次未完成的运行')
+    commands.add_parser('status', help='查看最近一次运行和发件箱状态，异常时返回1（可用于健康检查）')
+    search = commands.add_parser('search', help='在本地论文归档中全文检索（不联网）')
+    search.add_argument('query', help='检索词，支持 FTS5 语法，如 "diffusion AND video"、"state space model"、transform*')
+    search.add_argument('--since', help='只看此后发表的论文：日期（2025-01-31）或相对时间（90d、12w、3m、1y）')
+    search.add_argument('--group', help='只看命中该关键词组的论文')
+    search.add_argument('--limit', type=int, default=20, help='最多返回的论文数（默认20）')
+    commands.add_parser('help', help='显示帮助信息')
+    return parser
+
+
+def cmd_run(robot, args) -> bool:
+    logger.info("执行一次任务...")
+    robot.log_config()
+    if not args.profile:
+        return robot.run()
+    
+    from utils.profiler import profiling
+    with profiling(os.path.join(robot.state_dir, 'profiling'), top=args.profile_top):
+        return robot.run()
+
+
+def cmd_test(robot, args) -> bool:
+    logger.info("执行邮件配置测试...")
+    return robot.test_email()
+
+
+def cmd_flush(robot, args) -> bool:
+    logger.info("重试发件箱中的待发邮件...")
+    return robot.flush_outbox()
+
+
+def cmd_resume(robot, args) -> bool:
+    logger.info("从检查点恢复任务...")
+    return robot.resume(args.run_id)
+
+
+def cmd_status(robot, args) -> bool:
+    return robot.status()
+
+
+def cmd_search(robot, args) -> bool:
+    from utils.archive import parse_since
+    since = parse_since(args.since) if args.since else None
+    return robot.search(args.query, since=since, group=args.group, limit=args.limit)
+
+
+def cmd_daemon(robot, args) -> bool:
+    """启动定时任务"""
+    from utils.scheduler import PrefetchScheduler
+    from utils.config_watcher import ConfigWatcher
     
-    # 默认启动定时任务
     logger.info("启动定时任务...")
+    robot.log_config()
+    
+    prefetch = robot.checkpoint_enabled and getattr(robot.config, 'PREFETCH_ENABLED', True)
+    if not robot.checkpoint_enabled:
+        logger.warning("⚠️ 未启用检查点，无法提前准备，将在发送时间执行完整任务")
+    
+    scheduler = PrefetchScheduler(
+        prepare=lambda run_id: robot.run(run_id, deliver=False),
+        deliver=lambda run_id: robot.run(run_id),
+        process_time=robot.config.PROCESS_TIME,
+        history_path=os.path.join(robot.state_dir, 'schedule_history.json'),
+        prefetch=prefetch,
+        default_lead_minutes=getattr(robot.config, 'PREFETCH_DEFAULT_LEAD_MINUTES', 60),
+        catch_up_hours=getattr(robot.config, 'CATCH_UP_HOURS', 12),
+        retry_minutes=getattr(robot.config, 'DELIVERY_RETRY_MINUTES', 5),
+    )
+    
+    # 配置文件修改后热加载，调度器状态保持不变
+    def on_config_change(path, cfg) -> bool:
+        if not robot.reload_config(path, cfg):
+            return False
+        scheduler.update_process_time(robot.config.PROCESS_TIME)
+        return True
+    
+    watcher = None
+    if getattr(robot.config, 'HOT_RELOAD', True):
+        watcher = ConfigWatcher(robot.config_paths(), on_config_change,
+                                interval=getattr(robot.config, 'HOT_RELOAD_INTERVAL', 5))
+        watcher.start()
+    
+    logger.info(f"定时任务已设置，每天{robot.config.PROCESS_TIME}发送")
+    logger.info("按 Ctrl+C 停止程序")
+    
+    scheduler.run_forever()
+    return True
+
+
+COMMANDS = {
+    'daemon': cmd_daemon,
+    'run': cmd_run,
+    'test': cmd_test,
+    'flush': cmd_flush,
+    'resume': cmd_resume,
+    'status': cmd_status,
+    'search': cmd_search,
+}
+
+
+def main(argv: Optional[list] = None):
+    """主函数"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    command = args.command or 'daemon'
+    
+    # help 不读取配置和环境变量
+    if command == 'help':
+        parser.print_help()
+        sys.exit(0)
+    
+    # 加载环境变量
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    # 配置日志：主日志和API调用记录（JSONL）都在后台线程写入
+    from utils.logger import setup_api_log, setup_logger
+    setup_logger(os.getenv("LOG_LEVEL", "INFO"))
+    setup_api_log(
+        path=os.getenv("API_LOG_FILE", "output/api_calls.jsonl"),
+        max_bytes=int(os.getenv("API_LOG_MAX_BYTES", 10 * 1024 * 1024)),
+        backup_count=int(os.getenv("API_LOG_BACKUPS", 5)),
+    )
     
     try:
-        import schedule
-        robot = ArxivRobot()
-        
-        # 设置定时任务（每天上午9点执行）
-        schedule.every().day.at(config.PROCESS_TIME).do(robot.run)
-        
-        logger.info(f"定时任务已设置，每天{config.PROCESS_TIME}执行")
-        logger.info("按 Ctrl+C 停止程序")
-        
-        # 运行定时任务
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次
-            
+        with traffic_scope(args) as state_dir:
+            robot = create_robot(state_dir)
+            success = COMMANDS[command](robot, args)
     except KeyboardInterrupt:
         logger.info("程序被用户中断")
-    except ImportError:
-        logger.error("缺少schedule模块，请安装: pip install schedule")
-        sys.exit(1)
+        success = True
     except Exception as e:
-        logger.error(f"运行定时任务时出错: {e}")
-        sys.exit(1)
+        logger.error(f"执行 {command} 时出错: {e}")
+        success = False
+    sys.exit(0 if success else 1)
 
 
 if __name__ == "__main__":
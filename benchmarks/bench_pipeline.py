@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+流水线基准测试
+
+在合成语料上测量各阶段的吞吐和峰值内存：
+- filter:    PaperFilter.filter_papers，不同语料规模 × 不同关键词配置规模（可选多进程分片）
+- parse:     ArxivCrawler.parse_feed 解析Atom feed
+- render:    EmailSender.render_digest 渲染摘要邮件
+- summarize: AISummarizer 调用本地模拟AI接口（可设延迟和并发）
+- send:      EmailSender.deliver 发送到本地模拟SMTP服务器（可设延迟和并发）
+
+结果写入JSON文件，并可与保存的基线比较。
+
+用法:
+  python benchmarks/bench_pipeline.py                              # 默认规模 1k/10k/100k
+  python benchmarks/bench_pipeline.py --sizes 1000,10000,100000,1000000
+  python benchmarks/bench_pipeline.py --only filter,render
+  python benchmarks/bench_pipeline.py --only filter --filter-workers 1,2,4 --no-memory
+  python benchmarks/bench_pipeline.py --save-baseline              # 保存为基线
+  python benchmarks/bench_pipeline.py --check                      # 与基线比较，退步超过阈值时返回1
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import make_feed, make_keywords, make_papers, with_summaries  # noqa: E402
+from benchmarks.mock_servers import MockLLMServer, MockSMTPServer  # noqa: E402
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+BENCHMARKS = ['filter', 'parse', 'render', 'summarize', 'send']
+
+# 关键词配置规模：(组数, 每组关键词数)
+KEYWORD_CONFIGS = [(5, 5), (20, 10), (50, 20)]
+
+
+def measure(fn: Callable, items: int, unit: str, memory: bool = True) -> Dict:
+    """先计时运行一次，再在 tracemalloc 下运行一次取峰值内存（避免追踪开销影响计时）"""
+    gc.collect()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    result = {
+        'items': items,
+        'unit': unit,
+        'seconds': round(elapsed, 4),
+        'throughput': round(items / elapsed, 1) if elapsed > 0 else None,
+    }
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+        tracemalloc.stop()
+    return result
+
+
+def bench_filter(sizes: List[int], memory: bool, workers_list: List[int]) -> Dict:
+    from utils.paper_filter import PaperFilter
+
+    results = {}
+    for size in sizes:
+        papers = make_papers(size)
+        for groups, keywords in KEYWORD_CONFIGS:
+            paper_filter = PaperFilter(make_keywords(groups, keywords), [], [])
+            for workers in workers_list:
+                # 单进程的结果沿用原来的键名，便于与旧基线比较
+                suffix = f"/workers={workers}" if workers > 1 else ''
+                results[f"filter/papers={size}/keywords={groups}x{keywords}{suffix}"] = measure(
+                    lambda: paper_filter.filter_papers(papers, workers=workers), size, 'papers/s',
+                    memory and workers == 1)
+        del papers
+    return results
+
+
+def bench_parse(sizes: List[int], memory: bool, max_parse: int) -> Dict:
+    from utils.arxiv_crawler import ArxivCrawler
+
+    crawler = ArxivCrawler(categories=[])
+    results = {}
+    for size in sorted({min(size, max_parse) for size in sizes}):
+        # 与API一致，每页200篇
+        papers = make_papers(size)
+        pages = [make_feed(papers[i:i + 200]) for i in range(0, size, 200)]
+        results[f"parse/papers={size}"] = measure(
+            lambda: [crawler.parse_feed(page) for page in pages], size, 'papers/s', memory)
+    return results
+
+
+def bench_render(memory: bool, repeat: int = 50) -> Dict:
+    from utils.email_sender import EmailSender
+
+    results = {}
+    for groups, per_group in [(5, 10), (20, 10), (20, 50)]:
+        papers = with_summaries(make_papers(groups * per_group))
+        digest = {f"group_{g}": papers[g * per_group:(g + 1) * per_group] for g in range(groups)}
+        sender = EmailSender(max_paper_per_group=per_group)
+        results[f"render/groups={groups}/papers_per_group={per_group}"] = measure(
+            lambda: [sender.render_digest(digest) for _ in range(repeat)], repeat, 'digests/s', memory)
+    return results
+
+
+def bench_summarize(count: int, workers_list: List[int], latency: float) -> Dict:
+    from utils.ai_summarizer import AISummarizer
+
+    papers = make_papers(count)
+    results = {}
+    with MockLLMServer(latency) as server:
+        os.environ.update({
+            'OPENAI_API_KEY': 'mock', 'OPENAI_API_URL': server.url, 'USE_AI_SUMMARY': 'TRUE',
+        })
+        for workers in workers_list:
+            summarizer = AISummarizer()
+
+            def run():
+                summarizer.summary_cache.clear()
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(summarizer.summarize_cached, papers))
+
+            results[f"summarize/papers={count}/workers={workers}/latency={latency}"] = measure(
+                run, count, 'papers/s', memory=False)
+    return results
+
+
+def bench_send(count: int, workers_list: List[int], latency: float) -> Dict:
+    from utils.email_sender import EmailSender
+
+    digest = {'group_0': with_summaries(make_papers(10))}
+    results = {}
+    with MockSMTPServer(latency) as server:
+        os.environ.update({
+            'EMAIL_HOST': server.host, 'EMAIL_PORT': str(server.port), 'EMAIL_STARTTLS': 'FALSE',
+            'EMAIL_USER': 'bench@example.com', 'EMAIL_PASSWORD': 'mock',
+        })
+        for workers in workers_list:
+            os.environ['EMAIL_MAX_WORKERS'] = str(workers)
+            sender = EmailSender()
+            subject, body = sender.render_digest(digest)
+            message = sender.build_message(body, subject)
+            deliveries = [(f"user{i}@example.com", message) for i in range(count)]
+
+            def run():
+                failed = [error for _, error in sender.deliver(deliveries) if error]
+                if failed:
+                    raise RuntimeError(f"{len(failed)} 封邮件发送失败: {failed[0]}")
+
+            results[f"send/emails={count}/workers={workers}/latency={latency}"] = measure(
+                run, count, 'emails/s', memory=False)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> Tuple[int, List[str]]:
+    """与基线比较，返回 (比较的项数, 退步项说明)"""
+    compared = 0
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        compared += 1
+        if base.get('throughput') and result.get('throughput'):
+            ratio = result['throughput'] / base['throughput']
+            if ratio < 1 - tolerance:
+                regressions.append(f"{key}: 吞吐 {result['throughput']} vs 基线 {base['throughput']} ({ratio:.0%})")
+        if base.get('peak_mb') and result.get('peak_mb'):
+            ratio = result['peak_mb'] / base['peak_mb']
+            if ratio > 1 + tolerance:
+                regressions.append(f"{key}: 峰值内存 {result['peak_mb']} MB vs 基线 {base['peak_mb']} MB ({ratio:.0%})")
+    return compared, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='arXiv机器人流水线基准测试')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='筛选语料规模，逗号分隔（最大可到1000000）')
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help=f"只运行部分测试: {','.join(BENCHMARKS)}")
+    parser.add_argument('--filter-workers', default='1', help='筛选的进程数，逗号分隔（如 1,2,4）')
+    parser.add_argument('--max-parse', type=int, default=20000, help='feed解析的最大论文数')
+    parser.add_argument('--no-memory', action='store_true', help='不测量峰值内存（大规模时节省一半时间）')
+    parser.add_argument('--summary-count', type=int, default=200, help='总结测试的论文数')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='模拟AI接口每次请求的延迟（秒）')
+    parser.add_argument('--send-count', type=int, default=200, help='发送测试的邮件数')
+    parser.add_argument('--smtp-latency', type=float, default=0.01, help='模拟SMTP服务器每封邮件的延迟（秒）')
+    parser.add_argument('--workers', default='1,4', help='总结和发送的并发数，逗号分隔')
+    parser.add_argument('--output', help='结果JSON文件，默认 output/benchmarks/bench-<时间>.json')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--check', action='store_true', help='有退步时返回1')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的退步比例')
+    args = parser.parse_args()
+
+    # 基线与机器相关，不随代码提交；--check 时没有基线直接失败，避免“没有可比较的项”被当作通过
+    if args.check and not os.path.exists(args.baseline):
+        print(f"❌ 找不到基线文件 {args.baseline}，请先在本机运行 --save-baseline 生成基线")
+        sys.exit(1)
+
+    # 基准测试只关心耗时，关闭业务日志
+    logging.disable(logging.WARNING)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    workers = [int(w) for w in args.workers.split(',')]
+    only = set(args.only.split(','))
+    memory = not args.no_memory
+
+    runners = {
+        'filter': lambda: bench_filter(sizes, memory, [int(w) for w in args.filter_workers.split(',')]),
+        'parse': lambda: bench_parse(sizes, memory, args.max_parse),
+        'render': lambda: bench_render(memory),
+        'summarize': lambda: bench_summarize(args.summary_count, workers, args.llm_latency),
+        'send': lambda: bench_send(args.send_count, workers, args.smtp_latency),
+    }
+    results, skipped = {}, {}
+    for name in BENCHMARKS:
+        if name not in only:
+            continue
+        try:
+            stage_results = runners[name]()
+        except ImportError as e:
+            # 缺少可选依赖（如 feedparser、requests）时跳过该项
+            skipped[name] = str(e)
+            print(f"{name:<10} 跳过: {e}")
+            continue
+        for key, result in stage_results.items():
+            memory_str = f", 峰值 {result['peak_mb']} MB" if 'peak_mb' in result else ''
+            print(f"{key:<55} {result['throughput']:>12} {result['unit']}{memory_str}")
+        results.update(stage_results)
+
+    report = {
+        'meta': {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'results': results,
+        'skipped': skipped,
+    }
+    output = args.output or os.path.join(ROOT, 'output', 'benchmarks', f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+
+    if args.save_baseline:
+        # 合并到已有基线，只跑部分测试时不会覆盖其他项
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"基线已保存到 {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            compared, regressions = compare(results, json.load(f), args.tolerance)
+        if not compared:
+            print(f"⚠️ 基线 {args.baseline} 中没有本次运行的任何项，请用相同参数运行 --save-baseline")
+            if args.check:
+                sys.exit(1)
+        elif regressions:
+            print(f"⚠️ 相比基线退步 {len(regressions)} 项:")
+            for line in regressions:
+                print(f"  - {line}")
+            if args.check:
+                sys.exit(1)
+        else:
+            print("✅ 与基线相比无明显退步")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准测试
+
+多次以子进程方式运行 arxiv_robot.py 的轻量命令（help、status），
+统计启动耗时并列出导入最慢的模块。
+
+用法: python benchmarks/bench_startup.py [--repeat 20] [--output result.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'arxiv_robot.py')
+COMMANDS = [['help'], ['status']]
+
+
+def time_command(args, repeat: int) -> dict:
+    """运行 repeat 次，返回耗时统计（毫秒）"""
+    durations = []
+    returncode = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, SCRIPT] + args, cwd=ROOT,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        durations.append((time.perf_counter() - started) * 1000)
+        returncode = result.returncode
+    return {
+        'command': ' '.join(args),
+        'returncode': returncode,
+        'median_ms': round(statistics.median(durations), 1),
+        'min_ms': round(min(durations), 1),
+        'max_ms': round(max(durations), 1),
+    }
+
+
+def slowest_imports(args, top: int = 10) -> list:
+    """用 -X importtime 找出累计导入耗时最长的模块"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', SCRIPT] + args, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append({'module': name.strip(), 'cumulative_ms': round(int(cumulative_us) / 1000, 1)})
+    imports.sort(key=lambda item: item['cumulative_ms'], reverse=True)
+    return imports[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='arxiv_robot.py 启动耗时基准测试')
+    parser.add_argument('--repeat', type=int, default=20, help='每个命令运行次数')
+    parser.add_argument('--output', help='结果写入的JSON文件')
+    args = parser.parse_args()
+
+    # 解释器本身的启动耗时作为参照
+    baseline = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'])
+        baseline.append((time.perf_counter() - started) * 1000)
+
+    report = {
+        'python': sys.version.split()[0],
+        'interpreter_ms': round(statistics.median(baseline), 1),
+        'commands': [time_command(command, args.repeat) for command in COMMANDS],
+        'slowest_imports': {' '.join(command): slowest_imports(command) for command in COMMANDS},
+    }
+
+    print(f"Python 解释器启动: {report['interpreter_ms']} ms")
+    for item in report['commands']:
+        status = '' if item['returncode'] == 0 else f" (返回码 {item['returncode']})"
+        print(f"{item['command']:<8} 中位数 {item['median_ms']} ms, 最快 {item['min_ms']} ms, 最慢 {item['max_ms']} ms{status}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+本地模拟服务模块
+
+MockLLMServer 模拟 OpenAI 兼容的 chat/completions 接口，MockSMTPServer 模拟SMTP服务器，
+二者都可设置每次请求的延迟，用于在无网络的环境下测量总结和发送的吞吐。
+"""
+
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AI_RESPONSE = "核心问题：如何在有限算力下提升生成质量\n关键思路：提出新的训练目标\n主要结论：在多个基准上取得最优结果"
+
+
+class _LLMHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self.server.requests += 1
+        time.sleep(self.server.latency)
+        body = json.dumps({'choices': [{'message': {'content': AI_RESPONSE}}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockLLMServer:
+    """模拟AI总结接口，每个请求等待 latency 秒后返回固定总结"""
+
+    def __init__(self, latency: float = 0.0):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _LLMHandler)
+        self._server.daemon_threads = True
+        self._server.latency = latency
+        self._server.requests = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1/chat/completions"
+
+    @property
+    def requests(self) -> int:
+        return self._server.requests
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """最小的SMTP会话：接受任意登录，收到DATA后等待 latency 秒再确认"""
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        self.reply('220 mock ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().split(b' ', 1)[0].upper()
+            if command == b'EHLO':
+                self.wfile.write(b'250-mock\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n')
+            elif command == b'AUTH':
+                self.reply('235 2.7.0 Authentication successful')
+            elif command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line == b'.\r\n':
+                        break
+                    size += len(data_line)
+                time.sleep(self.server.latency)
+                with self.server.lock:
+                    self.server.messages += 1
+                    self.server.bytes += size
+                self.reply('250 2.0.0 Ok: queued')
+            elif command == b'QUIT':
+                self.reply('221 2.0.0 Bye')
+                return
+            elif command in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self.reply('250 2.0.0 Ok')
+            else:
+                self.reply('502 5.5.2 Command not recognized')
+
+
+class MockSMTPServer:
+    """模拟SMTP服务器，记录收到的邮件数和字节数"""
+
+    def __init__(self, latency: float = 0.0):
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SMTPHandler)
+        self._server.daemon_threads = True
+        self._server.latency = latency
+        self._server.messages = 0
+        self._server.bytes = 0
+        self._server.lock = threading.Lock()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def host(self) -> str:
+        return '127.0.0.1'
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def messages(self) -> int:
+        return self._server.messages
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
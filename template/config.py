@@ -54,8 +54,78 @@ KEYWORDS = {
 MAX_PAPERS_PER_CATEGORY = 5000  # 每个类别最多爬取论文数
 DAYS_BACK = 7  # 爬取最近几天的论文（改为7天）
 
+# 流水线模式: "sequential" 依次爬取、筛选、总结; "streaming" 各阶段通过有界队列流式并发，
+# 第一个类别爬取完成即开始筛选并总结高分论文
+PIPELINE_MODE = "sequential"
+PIPELINE_QUEUE_SIZE = 1000  # 流式模式阶段间队列长度
+SUMMARY_WORKERS = 4  # 流式模式AI总结并发数
+
 # 邮件设置
 EMAIL_SUBJECT_PREFIX = "[arXiv日报]"
 MAX_PAPERS_PER_GROUP = 5  # 每封邮件最多包含论文数
 
-PROCESS_TIME = "00:01"
\ No newline at end of file
+# 订阅设置（可选）：为收件人单独指定关键词组和每组论文上限
+# format: {"email": {"groups": [group_name, ...], "max_papers_per_group": 3}}
+# 未在此处出现的 RECIPIENT_EMAIL 收件人订阅全部关键词组，上限为 MAX_PAPERS_PER_GROUP
+# 爬取、筛选和总结每次运行只执行一次，每个订阅只多一次渲染和发送
+SUBSCRIPTIONS = {}
+
+# 收件人（可选）：多配置运行时为本配置单独指定收件人，未设置时使用 .env 中的 RECIPIENT_EMAIL
+# RECIPIENT_EMAIL = ["team_b@example.com"]
+
+# 跳过已推送过的论文（按收件人记录），空出的名额由得分次高的新论文补上
+SKIP_SENT_PAPERS = True
+SENT_LEDGER_RETENTION_DAYS = 30  # 已推送记录保留天数，应大于 DAYS_BACK
+
+PROCESS_TIME = "00:01"  # 每天发送邮件的时间
+
+# 定时任务：根据最近几次的准备耗时提前爬取和总结，到 PROCESS_TIME 准时发送
+PREFETCH_ENABLED = True
+PREFETCH_DEFAULT_LEAD_MINUTES = 60  # 没有历史耗时记录时提前的分钟数
+CATCH_UP_HOURS = 12  # 启动时补跑多少小时内错过的任务
+DELIVERY_RETRY_MINUTES = 5  # 发送失败或有其他任务在运行时的首次重试间隔（之后加倍），超出补跑窗口后放弃
+
+# 定时任务运行时修改配置文件自动热加载（校验失败时继续使用旧配置）
+HOT_RELOAD = True
+HOT_RELOAD_INTERVAL = 5  # 检查配置文件的间隔（秒）
+
+# 状态目录（发件箱、检查点等运行状态）
+STATE_DIR = "output"
+
+# 检查点：保存每次运行各阶段的输出，`python arxiv_robot.py resume [run_id]` 从断点恢复
+CHECKPOINT_ENABLED = True
+CHECKPOINT_KEEP_RUNS = 7  # 保留最近几次运行的检查点
+
+# 爬取结果的内存上限（MB）：超过后转存到 output/spool 下的临时文件，筛选时逐批读回；0 表示不限制
+CRAWL_MEMORY_LIMIT_MB = 256
+
+# 筛选进程数：大规模回填时把论文分片到多个进程并行匹配；1 为单进程，0 为使用全部CPU核
+FILTER_WORKERS = 1
+# 每组只保留得分最高的前K篇（各分片合并时即截断，节省内存）；0 表示保留全部。
+# 应大于 MAX_PAPERS_PER_GROUP 与订阅人已收到论文数之和，否则跳过已发送论文后可能不足
+FILTER_TOP_K = 0
+
+# 筛选缓存：按论文版本和关键词组配置缓存匹配结果，只重新计算新论文和修改过的组
+# 超过 DAYS_BACK+1 天未再爬取到的论文从缓存中删除
+FILTER_CACHE_ENABLED = True
+
+# 近似重复检测：伴生论文、会议/研讨会版本等标题和摘要几乎相同的论文只保留得分最高的一篇，
+# 其余论文的链接附在其后；与订阅人以前收到过的论文近似重复时不再发送。签名保存在 output/near_duplicates.sqlite
+NEAR_DUPLICATE_ENABLED = True
+NEAR_DUPLICATE_THRESHOLD = 0.8  # 估计的 Jaccard 相似度（标题+摘要的三词片段）达到该值视为重复
+NEAR_DUPLICATE_RETENTION_DAYS = 180  # 签名保留天数
+
+# 全文提取：下载选中论文的PDF，把方法、引言、结论等章节一并交给AI总结（需要 pypdf）
+# 提取结果缓存在 output/fulltext/，超时或失败时只用摘要总结
+FULLTEXT_ENABLED = False
+FULLTEXT_PDF_URL = "https://arxiv.org/pdf/{arxiv_id}{version}"  # 可用 {arxiv_id}、{version} 占位，可指向本地镜像
+FULLTEXT_WORKERS = 2  # 下载和解析PDF的并发进程数
+FULLTEXT_MAX_CHARS = 6000  # 交给AI的正文节选最大字符数
+FULLTEXT_WAIT = 30  # 总结每篇论文时最多等待全文的秒数
+
+# 论文归档：爬取的论文、命中的关键词组和AI总结写入 output/archive.sqlite，
+# 可用 python arxiv_robot.py search 离线全文检索
+ARCHIVE_ENABLED = True
+
+# 运行指标：每次运行结束写入 output/metrics/run-<run_id>.json 和 Prometheus 文本文件 arxiv_robot.prom
+METRICS_ENABLED = True
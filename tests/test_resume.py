@@ -0,0 +1,162 @@
+"""
+发送失败后从检查点恢复
+"""
+
+import os
+import shutil
+import smtplib
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arxiv_robot import ArxivRobot
+from utils import email_sender
+from utils.checkpoint import RunCheckpoint
+from utils.paper_utils import utc_now
+from utils.profiles import load_profile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECIPIENTS = ['a@example.com', 'b@example.com']
+
+
+def make_papers(count: int):
+    published = utc_now().strftime('%Y-%m-%dT%H:%M:%SZ')
+    return [
+        {
+            'arxiv_id': f"2501.{i:05d}",
+            'version': 'v1',
+            'title': f"Discrete diffusion language model {i}",
+            'abstract': f"We study a diffusion language model for text generation. Variant {i}.",
+            'authors': ['A. Author'],
+            'published': published,
+            'updated': published,
+            'link': f"http://arxiv.org/abs/2501.{i:05d}v1",
+            'categories': ['cs.CL'],
+        }
+        for i in range(count)
+    ]
+
+
+class FakeCrawler:
+    def __init__(self, papers):
+        self.papers = papers
+        self.calls = 0
+
+    def fetch_papers(self, days_back=1, into=None):
+        self.calls += 1
+        if into is None:
+            return list(self.papers)
+        into.extend(self.papers)
+        return into
+
+
+class FakeSummarizer:
+    use_ai_summary = False
+
+    def __init__(self):
+        self.summary_cache = {}
+
+    def summarize_paper(self, title, abstract, sections=None):
+        return {'core_problem': title, 'key_approach': abstract, 'main_conclusion': ''}
+
+    def summarize_papers(self, papers, sections=None):
+        for paper in papers:
+            paper.setdefault('ai_summary', self.summarize_paper(paper['title'], paper['abstract']))
+        return len(papers)
+
+
+class FakeSMTP:
+    """记录送达的收件人；fail 为 True 时所有发送都失败"""
+
+    fail = False
+    delivered = []
+
+    def __init__(self, host, port, use_ssl):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def sendmail(self, sender, recipient, message):
+        if FakeSMTP.fail:
+            raise smtplib.SMTPException("服务器不可用")
+        FakeSMTP.delivered.append(recipient)
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ResumeAfterSendFailureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.state_dir, ignore_errors=True)
+        env = mock.patch.dict(os.environ, {
+            'EMAIL_USER': 'robot@example.com',
+            'EMAIL_PASSWORD': 'secret',
+            'RECIPIENT_EMAIL': ','.join(RECIPIENTS),
+            'EMAIL_RETRY_DELAY': '0',
+            'EMAIL_MAX_ATTEMPTS': '5',
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        factory = mock.patch.object(email_sender.SMTPSession, 'factory', staticmethod(FakeSMTP))
+        factory.start()
+        self.addCleanup(factory.stop)
+        FakeSMTP.fail = False
+        FakeSMTP.delivered = []
+
+        self.cfg = load_profile(os.path.join(ROOT, 'template', 'config.py'))
+        self.cfg.KEYWORDS = {'dllm': ['diffusion language model']}
+        self.cfg.SUBSCRIPTIONS = {}
+        self.cfg.PIPELINE_MODE = 'sequential'
+        self.cfg.METRICS_ENABLED = False
+        self.cfg.ARCHIVE_ENABLED = False
+        self.cfg.NEAR_DUPLICATE_ENABLED = False
+        self.crawler = FakeCrawler(make_papers(3))
+
+    def make_robot(self):
+        robot = ArxivRobot(self.cfg, summarizer_provider=FakeSummarizer, state_dir=self.state_dir)
+        robot.__dict__['crawler'] = self.crawler
+        return robot
+
+    def test_resume_without_run_id_sends_pending_emails(self):
+        FakeSMTP.fail = True
+        self.assertFalse(self.make_robot().run())
+        self.assertEqual(FakeSMTP.delivered, [])
+
+        robot = self.make_robot()
+        self.assertEqual(robot.outbox.pending_count(), len(RECIPIENTS))
+        self.assertIsNotNone(RunCheckpoint.latest_incomplete(robot.runs_dir))
+
+        FakeSMTP.fail = False
+        self.assertTrue(robot.resume())
+        self.assertEqual(sorted(FakeSMTP.delivered), RECIPIENTS)
+        self.assertEqual(robot.outbox.pending_count(), 0)
+        self.assertIsNone(RunCheckpoint.latest_incomplete(robot.runs_dir))
+        # 从发送阶段恢复，不重新爬取
+        self.assertEqual(self.crawler.calls, 1)
+
+    def test_streaming_resume_uses_crawl_checkpoint(self):
+        # 多配置运行在共享爬取后中断：流式配置恢复时使用爬取检查点，不重新爬取
+        self.cfg.PIPELINE_MODE = 'streaming'
+        robot = self.make_robot()
+        checkpoint = RunCheckpoint(robot.runs_dir, '20250101-000100')
+        checkpoint.save_items('crawl', make_papers(3))
+
+        self.assertTrue(robot.run('20250101-000100'))
+        self.assertEqual(self.crawler.calls, 0)
+        self.assertEqual(sorted(FakeSMTP.delivered), RECIPIENTS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,11 +5,14 @@ AI总结模块
 import requests
 import logging
 import re
-from typing import Dict
+import time
+from typing import Callable, Dict, List, Optional
 import os
 import json
 
 from utils.logger import APILogger
+from utils.metrics import metrics
+from utils.paper_utils import paper_version
 
 logger = logging.getLogger(__name__)
 api_logger = APILogger("OpenAI")
@@ -33,12 +36,30 @@ class AISummarizer:
             logger.info("使用基础总结功能（未启用AI或未配置API密钥）")
         
         self.enable_thinking = os.getenv("ENABLE_THINKING", "FALSE").lower() == "true"
+        
+        # 按arXiv编号+版本缓存总结结果，多个配置共享同一个实例时重叠论文只总结一次
+        self.summary_cache: Dict[str, Dict[str, str]] = {}
+    
+    def summarize_cached(self, paper: Dict, sections: Optional[Callable[[Dict], Optional[str]]] = None) -> Dict[str, str]:
+        """总结论文，命中缓存时不再调用API；失败的结果不缓存
+
+        sections 为可选的全文章节提供者（FullTextExtractor.sections），取不到时只使用摘要
+        """
+        key = paper_version(paper)
+        if key in self.summary_cache:
+            return self.summary_cache[key]
+        fulltext = sections(paper) if sections is not None and self.use_ai_summary else None
+        summary = self.summarize_paper(paper['title'], paper['abstract'], fulltext)
+        if not summary.get('_ai_failed'):
+            self.summary_cache[key] = summary
+        return summary
     
-    def summarize_paper(self, title: str, abstract: str) -> Dict[str, str]:
-        """总结论文"""
+    def summarize_paper(self, title: str, abstract: str, sections: Optional[str] = None) -> Dict[str, str]:
+        """总结论文，sections 为正文章节节选"""
         if not self.use_ai_summary:
             return self._basic_summary(abstract)
         
+        started = time.time()
         try:
             headers = {
                 "Accept": "application/json",
@@ -54,11 +75,12 @@ class AISummarizer:
 """
 # 4. 每部分信息不超过100字；
 
+            fulltext = f"正文节选:\n{sections}\n" if sections else ""
             prompt = f"""
 请分析以下学术论文，提取关键信息并回答：
 标题: {title}
 摘要: {abstract}
-
+{fulltext}
 请按照以下格式输出：
 核心问题：[论文要解决的核心问题]
 关键思路：[论文的主要方法和创新点]
@@ -97,7 +119,8 @@ class AISummarizer:
                     model=self.model_type,
                     prompt_preview=prompt,
                     success=True,
-                    response_preview=content
+                    response_preview=content,
+                    latency=time.time() - started
                 )
                 
                 logger.debug(content)
@@ -109,9 +132,11 @@ class AISummarizer:
                     model=self.model_type,
                     prompt_preview=prompt,
                     success=False,
-                    error=error_msg
+                    error=error_msg,
+                    latency=time.time() - started
                 )
                 logger.error(f"⚠️ AI总结失败，使用基础总结: HTTP {response.status_code}")
+                metrics.inc('ai_fallbacks_total')
                 result = self._basic_summary(abstract)
                 result['_ai_failed'] = True  # 标记为失败
                 return result
@@ -123,13 +148,38 @@ class AISummarizer:
                 model=self.model_type,
                 prompt_preview=f"标题: {title[:50]}...",
                 success=False,
-                error=str(e)
+                error=str(e),
+                latency=time.time() - started
             )
             logger.error(f"⚠️ AI总结失败，使用基础总结: {e}")
+            metrics.inc('ai_fallbacks_total')
             result = self._basic_summary(abstract)
             result['_ai_failed'] = True  # 标记为失败
             return result
     
+    def summarize_papers(self, papers: List[Dict], sections: Optional[Callable[[Dict], Optional[str]]] = None) -> int:
+        """批量总结论文，结果写入 paper['ai_summary']，同一篇论文只总结一次"""
+        summaries = {}
+        total = len({paper_version(paper) for paper in papers})
+        
+        for paper in papers:
+            key = paper_version(paper)
+            if key not in summaries:
+                if 'ai_summary' in paper:
+                    summaries[key] = paper['ai_summary']
+                elif key in self.summary_cache:
+                    summaries[key] = self.summary_cache[key]
+                else:
+                    logger.info(f"[{len(summaries) + 1}/{total}] 正在总结论文: {paper['title'][:50]}...")
+                    summaries[key] = self.summarize_cached(paper, sections)
+                    if summaries[key].get('_ai_failed'):
+                        logger.warning(f"[{len(summaries)}/{total}] ⚠️ AI总结失败，使用基础总结")
+                    else:
+                        logger.info(f"[{len(summaries)}/{total}] 论文总结完成 ✅")
+            paper['ai_summary'] = summaries[key]
+        
+        return len(summaries)
+    
     def _basic_summary(self, abstract: str) -> Dict[str, str]:
         """基础总结"""
         sentences = re.split(r'[.!?]+', abstract)
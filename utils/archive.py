@@ -0,0 +1,198 @@
+"""
+论文归档模块
+
+每次爬取的论文、筛选命中的关键词组和AI总结写入本地 SQLite 数据库，标题和摘要建立 FTS5 全文索引，
+`python arxiv_robot.py search` 无需联网即可检索历史论文。
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from utils.paper_utils import paper_id, utc_now
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    arxiv_id TEXT NOT NULL UNIQUE,
+    version TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL,
+    abstract TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    categories TEXT NOT NULL,
+    published TEXT NOT NULL,
+    link TEXT NOT NULL,
+    summary TEXT
+);
+CREATE INDEX IF NOT EXISTS papers_published ON papers (published);
+CREATE TABLE IF NOT EXISTS paper_groups (
+    arxiv_id TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (arxiv_id, group_name)
+);
+CREATE INDEX IF NOT EXISTS paper_groups_group ON paper_groups (group_name);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, abstract, content='papers', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts (rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, abstract) VALUES ('delete', old.id, old.title, old.abstract);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE OF title, abstract ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, abstract) VALUES ('delete', old.id, old.title, old.abstract);
+    INSERT INTO papers_fts (rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+END;
+"""
+
+# 排序时标题的权重高于摘要，与筛选打分一致
+TITLE_WEIGHT = 3.0
+
+SINCE_UNITS = {'d': 1, 'w': 7, 'm': 30, 'y': 365}
+
+
+def parse_since(text: str) -> str:
+    """解析 --since：日期（2025-01-31）或相对时间（90d、12w、3m、1y），返回可与发表时间比较的ISO字符串"""
+    match = re.fullmatch(r'(\d+)([dwmy])', text.strip().lower())
+    if match:
+        days = int(match.group(1)) * SINCE_UNITS[match.group(2)]
+        return (utc_now() - timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    if re.fullmatch(r'\d{4}-\d{2}-\d{2}', text.strip()):
+        return text.strip()
+    raise ValueError(f"无法解析时间: {text}（示例: 2025-01-31、90d、3m、1y）")
+
+
+def _quote_query(query: str) -> str:
+    """把普通文本转为 FTS5 查询：每个词加引号，避免 '-'、':' 等被当作语法"""
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+class PaperArchive:
+    """论文归档与全文检索"""
+
+    def __init__(self, path: str = 'output/archive.sqlite'):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def add_papers(self, papers: Iterable[Dict], batch_size: int = 1000) -> int:
+        """写入爬取到的论文，已有论文更新为最新版本（版本不变时保留已有的总结），返回写入数"""
+        count = 0
+        batch = []
+        for paper in papers:
+            batch.append((
+                paper_id(paper), paper.get('version', ''), paper['title'], paper['abstract'],
+                json.dumps(paper.get('authors', []), ensure_ascii=False),
+                json.dumps(paper.get('categories', [])), paper.get('published', ''), paper.get('link', ''),
+            ))
+            if len(batch) >= batch_size:
+                count += self._upsert(batch)
+                batch = []
+        if batch:
+            count += self._upsert(batch)
+        return count
+
+    def _upsert(self, rows: List[tuple]) -> int:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO papers (arxiv_id, version, title, abstract, authors, categories, published, link) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (arxiv_id) DO UPDATE SET version = excluded.version, title = excluded.title, "
+                "abstract = excluded.abstract, authors = excluded.authors, categories = excluded.categories, "
+                "published = excluded.published, link = excluded.link, "
+                "summary = CASE WHEN papers.version = excluded.version THEN papers.summary END",
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def add_matches(self, filtered_papers: Dict[str, List[Dict]]):
+        """记录论文命中的关键词组和得分"""
+        rows = [
+            (paper_id(paper), group_name, paper.get('relevance_score', 0))
+            for group_name, group_papers in filtered_papers.items()
+            for paper in group_papers
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO paper_groups (arxiv_id, group_name, score) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def add_summaries(self, papers: Iterable[Dict]):
+        """保存AI总结（失败后的基础总结不保存）"""
+        rows = {
+            paper_id(paper): json.dumps(paper['ai_summary'], ensure_ascii=False)
+            for paper in papers
+            if paper.get('ai_summary') and not paper['ai_summary'].get('_ai_failed')
+        }
+        with self._lock:
+            self._conn.executemany("UPDATE papers SET summary = ? WHERE arxiv_id = ?",
+                                   [(summary, key) for key, summary in rows.items()])
+            self._conn.commit()
+
+    def search(self, query: str, since: Optional[str] = None, group: Optional[str] = None,
+               limit: int = 20) -> List[Dict]:
+        """全文检索，按 BM25 相关度排序
+
+        query 支持 FTS5 语法（AND、OR、NOT、"短语"、前缀*），语法错误时按普通词语检索
+        """
+        sql = (
+            "SELECT p.arxiv_id, p.version, p.title, p.abstract, p.authors, p.categories, p.published, p.link, "
+            "p.summary, bm25(papers_fts, ?, 1.0) AS rank, "
+            "(SELECT group_concat(g.group_name, ',') FROM paper_groups g WHERE g.arxiv_id = p.arxiv_id) AS groups "
+            "FROM papers_fts JOIN papers p ON p.id = papers_fts.rowid "
+            "WHERE papers_fts MATCH ?"
+        )
+        params: list = [TITLE_WEIGHT, query]
+        if since:
+            sql += " AND p.published >= ?"
+            params.append(since)
+        if group:
+            sql += " AND EXISTS (SELECT 1 FROM paper_groups g WHERE g.arxiv_id = p.arxiv_id AND g.group_name = ?)"
+            params.append(group)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError:
+                params[1] = _quote_query(query)
+                rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                'arxiv_id': row['arxiv_id'],
+                'version': row['version'],
+                'title': row['title'],
+                'abstract': row['abstract'],
+                'authors': json.loads(row['authors']),
+                'categories': json.loads(row['categories']),
+                'published': row['published'],
+                'link': row['link'],
+                'ai_summary': json.loads(row['summary']) if row['summary'] else None,
+                'groups': row['groups'].split(',') if row['groups'] else [],
+                'rank': -row['rank'],
+            }
+            for row in rows
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
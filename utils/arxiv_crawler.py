@@ -1,46 +1,46 @@
 """
-AI总结模块
+arXiv爬虫模块
 """
 
 import requests
+import feedparser
 import logging
-import re
-from typing import Dict, Optional
 import os
-import json
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
 
 from utils.logger import APILogger
+from utils.metrics import metrics
+from utils.paper_utils import parse_arxiv_id, utc_now
 
 logger = logging.getLogger(__name__)
-api_logger = APILogger("OpenAI")
-
-
-class AISummarizer:
-    """AI总结器"""
-    
-    def __init__(self, api_key: str = None):
-        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
-        self.api_url = os.getenv("OPENAI_API_URL", None)
-        self.model_type = os.getenv("MODEL_TYPE", "gpt-3.5-turbo")
-        self.use_ai_summary = os.getenv("USE_AI_SUMMARY", "TRUE").lower() == "true"
-        
-        if not self.api_key or self.api_url is None:
-            self.use_ai_summary = False
-            
-        if self.use_ai_summary:
-            logger.info("启用AI总结功能")
-        else:
-            logger.info("使用基础总结功能（未启用AI或未配置API密钥）")
-        
-        self.enable_thinking = os.getenv("ENABLE_THINKING", "FALSE").lower() == "true"
-        # 从环境变量读取代理设置
+api_logger = APILogger("arXiv")
+
+
+class ArxivCrawler:
+    """arXiv论文爬虫"""
+
+    API_URL = "http://export.arxiv.org/api/query"
+    # 请求间隔的缩放比例，回放时按 --replay-scale 缩放（0 为不等待）
+    interval_scale: float = 1.0
+
+    def __init__(self, categories: List[str], max_papers_per_category: int = 100,
+                 page_size: int = 200, request_interval: float = 3.0):
+        self.categories = categories
+        self.max_papers_per_category = max_papers_per_category
+        self.page_size = page_size
+        # arXiv API 要求连续请求间隔至少3秒
+        self.request_interval = request_interval
         self.proxies = self._get_proxies()
-    
+        self._last_request = 0.0
+
     def _get_proxies(self) -> Optional[Dict[str, str]]:
         """从环境变量获取代理设置"""
         http_proxy = os.getenv('http_proxy') or os.getenv('HTTP_PROXY')
         https_proxy = os.getenv('https_proxy') or os.getenv('HTTPS_PROXY')
-        
+
         if http_proxy or https_proxy:
             proxies = {}
             if http_proxy:
@@ -49,159 +49,124 @@ class AISummarizer:
                 proxies['https'] = https_proxy
             return proxies
         return None
-    
-    def summarize_paper(self, title: str, abstract: str) -> Dict[str, str]:
-        """总结论文"""
-        if not self.use_ai_summary:
-            return self._basic_summary(abstract)
-        
-        try:
-            headers = {
-                "Accept": "application/json",
-                "Content-Type": "application/json"
-            }
-            
-            # 如果提供了 API key，添加到 headers 中
-            if self.api_key:
-                headers["Authorization"] = f"Bearer {self.api_key}"
-            
-            system_prompt = f"""
-你是一名专业的学术分析助手，擅长从学术论文中提取关键问题、创新点和结论。你需要用简洁、准确、科学的语言，根据提供的论文内容进行分析提取信息。请基于以下要求完成任务：
-1. 用中文回答，避免使用不必要的冗长语言；
-2. 强调论文技术要点和创新性；
-3. 以清晰的结构归纳并输出所需信息。
-"""
-# 4. 每部分信息不超过100字；
 
-            prompt = f"""
-请分析以下学术论文，提取关键信息并回答：
-标题: {title}
-摘要: {abstract}
+    def _request(self, params: Dict) -> str:
+        """请求arXiv API"""
+        wait = self.request_interval * self.interval_scale - (time.time() - self._last_request)
+        if wait > 0:
+            time.sleep(wait)
 
-请按照以下格式输出：
-核心问题：[论文要解决的核心问题]
-关键思路：[论文的主要方法和创新点]
-主要结论：[论文的主要发现和结果]
-
-（请严格遵循格式要求并用简洁语言表达。）
-"""
-            
-            if not self.enable_thinking:
-                if "qwen3" in self.model_type.lower():
-                    prompt += "/no_think"
-            
-            data = {
-                "model": self.model_type,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "stream": False,
-                "enable_thinking": self.enable_thinking,
-            }
-            
-            # 发送请求（支持代理）
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                data=json.dumps(data),
-                proxies=self.proxies,
-                verify=False,
-                timeout=120  # 增加超时时间
-            )
-            
-            # 检查响应
-            if response.status_code == 200:
-                result = response.json()
-                content = result.get('choices', [{}])[0].get('message', {}).get('content', '')
-                
-                # 记录成功到文件
-                api_logger.log_openai_request(
-                    model=self.model_type,
-                    prompt_preview=prompt,
-                    success=True,
-                    response_preview=content
-                )
-                
-                logger.debug(content)
-                return self._parse_ai_response(content)
-            else:
-                # 记录失败到文件
-                error_text = response.text[:500]  # 显示更多错误信息
-                error_msg = f"HTTP {response.status_code}: {error_text}"
-                api_logger.log_openai_request(
-                    model=self.model_type,
-                    prompt_preview=prompt,
-                    success=False,
-                    error=error_msg
-                )
-                logger.error(f"⚠️ AI总结失败，使用基础总结: HTTP {response.status_code}")
-                logger.error(f"⚠️ API URL: {self.api_url}")
-                logger.error(f"⚠️ 错误详情: {error_text}")
-                if response.status_code == 401:
-                    logger.error(f"⚠️ 认证失败！请检查 OPENAI_API_KEY 是否正确设置")
-                result = self._basic_summary(abstract)
-                result['_ai_failed'] = True  # 标记为失败
-                return result
-                
+        started = time.time()
+        try:
+            response = requests.get(self.API_URL, params=params, proxies=self.proxies, timeout=60)
+            self._last_request = time.time()
+            response.raise_for_status()
+            api_logger.log_api_call("arXiv", self.API_URL, status="success",
+                                    response_data={'query': params.get('search_query'), 'start': params.get('start')},
+                                    latency=self._last_request - started, size=len(response.content))
+            return response.text
         except Exception as e:
-            # 记录异常到文件
-            api_logger.log_openai_request(
-                model=self.model_type,
-                prompt_preview=f"标题: {title[:50]}...",
-                success=False,
-                error=str(e)
-            )
-            logger.error(f"⚠️ AI总结失败，使用基础总结: {e}")
-            result = self._basic_summary(abstract)
-            result['_ai_failed'] = True  # 标记为失败
-            return result
-    
-    def _basic_summary(self, abstract: str) -> Dict[str, str]:
-        """基础总结"""
-        sentences = re.split(r'[.!?]+', abstract)
+            self._last_request = time.time()
+            api_logger.log_api_call("arXiv", self.API_URL, status="failed", error=str(e),
+                                    latency=self._last_request - started)
+            raise
+
+    def parse_feed(self, feed_text: str) -> List[Dict]:
+        """解析API返回的Atom feed"""
+        feed = feedparser.parse(feed_text)
+        return [self._parse_entry(entry) for entry in feed.entries]
+
+    @staticmethod
+    def _parse_entry(entry) -> Dict:
+        """解析单篇论文"""
+        arxiv_id, version = parse_arxiv_id(entry.get('id', ''))
+        link = entry.get('link') or entry.get('id', '')
         return {
-            'core_problem': sentences[0].strip() if sentences else abstract[:200],
-            'key_approach': sentences[1].strip() if len(sentences) > 1 else abstract[200:400],
-            'main_conclusion': sentences[-1].strip() if sentences else abstract[-200:]
+            'arxiv_id': arxiv_id,
+            'version': version,
+            'title': re.sub(r'\s+', ' ', entry.get('title', '')).strip(),
+            'abstract': re.sub(r'\s+', ' ', entry.get('summary', '')).strip(),
+            'authors': [author.get('name', '') for author in entry.get('authors', [])],
+            'published': entry.get('published', ''),
+            'updated': entry.get('updated', ''),
+            'link': link,
+            'categories': [tag.get('term') for tag in entry.get('tags', []) if tag.get('term')],
         }
-    
-    def _parse_ai_response(self, content: str) -> Dict[str, str]:
-        """解析AI响应"""
-        result = {'core_problem': '', 'key_approach': '', 'main_conclusion': ''}
-        
-        lines = content.split('\n')
-        current_section = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
+
+    def iter_category(self, category: str, days_back: int = 1) -> Iterator[List[Dict]]:
+        """按页爬取单个类别，逐页返回论文，遇到早于时间窗口的论文时停止"""
+        cutoff = utc_now() - timedelta(days=days_back)
+        fetched = 0
+
+        while fetched < self.max_papers_per_category:
+            params = {
+                'search_query': f'cat:{category}',
+                'start': fetched,
+                'max_results': min(self.page_size, self.max_papers_per_category - fetched),
+                'sortBy': 'submittedDate',
+                'sortOrder': 'descending',
+            }
+            papers = self.parse_feed(self._request(params))
+            if not papers:
+                break
+
+            fetched += len(papers)
+            in_window = [p for p in papers if self.published_after(p, cutoff)]
+            if in_window:
+                yield in_window
+            if len(in_window) < len(papers):
+                break
+
+    @staticmethod
+    def published_after(paper: Dict, cutoff: datetime) -> bool:
+        try:
+            published = datetime.fromisoformat(paper['published'].replace('Z', '+00:00'))
+        except (ValueError, AttributeError):
+            return True
+        return published >= cutoff
+
+    def fetch_category(self, category: str, days_back: int = 1) -> List[Dict]:
+        """爬取单个类别"""
+        papers = []
+        for page in self.iter_category(category, days_back):
+            papers.extend(page)
+        logger.info(f"{category}: 爬取 {len(papers)} 篇论文")
+        return papers
+
+    def fetch_papers(self, days_back: int = 1, into=None):
+        """爬取所有类别，按arXiv编号去重
+
+        into 为可选的 PaperSpool，传入时逐页写入其中并返回它，爬取结果不必全部留在内存中；否则返回列表
+        """
+        papers = into if into is not None else []
+        seen = set()
+        errors = []
+        for category in self.categories:
+            pages = self.iter_category(category, days_back)
+            count = 0
+            try:
+                while True:
+                    with metrics.stage('crawl'):
+                        page = next(pages, None)
+                    if page is None:
+                        break
+                    count += len(page)
+
+                    with metrics.stage('dedup'):
+                        unique = 0
+                        for paper in page:
+                            if paper['arxiv_id'] not in seen:
+                                seen.add(paper['arxiv_id'])
+                                papers.append(paper)
+                                unique += 1
+                    metrics.inc('papers_fetched_total', len(page))
+                    metrics.inc('duplicates_total', len(page) - unique)
+            except Exception as e:
+                logger.error(f"❌ 爬取 {category} 失败: {e}")
+                errors.append(e)
                 continue
-            
-            if '核心问题' in line or 'Core Problem' in line:
-                current_section = 'core_problem'
-                # 移除"核心问题："前缀
-                result[current_section] = line.split('：', 1)[-1].split(':', 1)[-1].strip()
-            elif '关键思路' in line or 'Key Approach' in line:
-                current_section = 'key_approach'
-                # 移除"关键思路："前缀
-                result[current_section] = line.split('：', 1)[-1].split(':', 1)[-1].strip()
-            elif '主要结论' in line or 'Main Conclusion' in line:
-                current_section = 'main_conclusion'
-                # 移除"主要结论："前缀
-                result[current_section] = line.split('：', 1)[-1].split(':', 1)[-1].strip()
-            elif current_section and line and not line.startswith('【') and not line.startswith('['):
-                # 继续添加到当前section
-                result[current_section] += ' ' + line
-        
-        # 清理每个字段
-        for key in result:
-            result[key] = result[key].strip()
-        
-        return result
+            logger.info(f"{category}: 爬取 {count} 篇论文")
+
+        if errors and len(errors) == len(self.categories):
+            raise RuntimeError(f"所有类别爬取失败: {errors[-1]}")
+        return papers
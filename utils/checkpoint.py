@@ -0,0 +1,116 @@
+"""
+运行检查点模块
+"""
+
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Any, Iterable, List, Optional
+
+from utils.storage import iter_json_items, load_json, save_json, save_json_items
+
+logger = logging.getLogger(__name__)
+
+
+class RunCheckpoint:
+    """运行检查点：按运行ID保存每个阶段的输出，失败后从第一个未完成的阶段恢复"""
+
+    STAGES = ['crawl', 'filter', 'summarize', 'render', 'deliver']
+
+    def __init__(self, runs_dir: str = 'output/runs', run_id: Optional[str] = None, enabled: bool = True):
+        self.runs_dir = runs_dir
+        self.run_id = run_id or self.new_run_id()
+        self.enabled = enabled
+        self.run_dir = os.path.join(runs_dir, self.run_id)
+        self._status_path = os.path.join(self.run_dir, 'status.json')
+
+        self.status = load_json(self._status_path, default=None) if enabled else None
+        self.resumed = self.status is not None
+        if self.status is None:
+            self.status = {
+                'run_id': self.run_id,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'completed_stages': [],
+                'finished': False,
+            }
+
+    @staticmethod
+    def new_run_id() -> str:
+        """新运行的ID：启动时间加随机后缀，同一秒内启动的两次运行不会共用检查点"""
+        return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:4]}"
+
+    def _stage_path(self, stage: str) -> str:
+        return os.path.join(self.run_dir, f"{stage}.json")
+
+    def has(self, stage: str) -> bool:
+        return stage in self.status['completed_stages']
+
+    def load(self, stage: str) -> Any:
+        """读取阶段输出，未完成时返回None"""
+        if not self.enabled or not self.has(stage):
+            return None
+        return load_json(self._stage_path(stage))
+
+    def load_items(self, stage: str, into):
+        """把列表形式的阶段输出逐条读入 into（如 PaperSpool），不在内存中还原整个列表；未完成时返回None"""
+        if not self.enabled or not self.has(stage):
+            return None
+        into.extend(iter_json_items(self._stage_path(stage)))
+        return into
+
+    def save(self, stage: str, data: Any):
+        """保存阶段输出并标记完成"""
+        if not self.enabled:
+            return
+        save_json(self._stage_path(stage), data)
+        self._complete(stage)
+
+    def save_items(self, stage: str, items: Iterable):
+        """逐条保存列表形式的阶段输出（如转存到磁盘的爬取结果），读取时仍为列表"""
+        if not self.enabled:
+            return
+        save_json_items(self._stage_path(stage), items)
+        self._complete(stage)
+
+    def _complete(self, stage: str):
+        if stage not in self.status['completed_stages']:
+            self.status['completed_stages'].append(stage)
+        save_json(self._status_path, self.status)
+
+    def first_incomplete(self) -> Optional[str]:
+        """第一个未完成的阶段"""
+        for stage in reversed(self.STAGES):
+            if self.has(stage):
+                index = self.STAGES.index(stage) + 1
+                return self.STAGES[index] if index < len(self.STAGES) else None
+        return self.STAGES[0]
+
+    def finish(self):
+        """标记整次运行完成"""
+        self.status['finished'] = True
+        if self.enabled:
+            save_json(self._status_path, self.status)
+
+    @staticmethod
+    def list_runs(runs_dir: str) -> List[str]:
+        """按时间顺序列出所有运行ID"""
+        if not os.path.isdir(runs_dir):
+            return []
+        return sorted(d for d in os.listdir(runs_dir) if os.path.exists(os.path.join(runs_dir, d, 'status.json')))
+
+    @classmethod
+    def latest_incomplete(cls, runs_dir: str) -> Optional[str]:
+        """最近一次未完成的运行ID"""
+        for run_id in reversed(cls.list_runs(runs_dir)):
+            status = load_json(os.path.join(runs_dir, run_id, 'status.json'), default={})
+            if not status.get('finished'):
+                return run_id
+        return None
+
+    @classmethod
+    def cleanup(cls, runs_dir: str, keep: int = 7):
+        """只保留最近 keep 次运行的检查点"""
+        for run_id in cls.list_runs(runs_dir)[:-keep] if keep > 0 else []:
+            shutil.rmtree(os.path.join(runs_dir, run_id), ignore_errors=True)
@@ -0,0 +1,77 @@
+"""
+配置热加载模块
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, Dict, List
+
+from utils.profiles import load_profile, validate_config
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigWatcher:
+    """监视配置文件变化，校验通过后交给回调应用
+
+    回调返回False表示暂时无法应用（例如任务正在运行），下次检查时重试；
+    回调抛出异常表示拒绝该版本，文件再次修改前不再加载。
+    """
+
+    def __init__(self, paths: List[str], on_change: Callable[[str, object], bool], interval: float = 5):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.on_change = on_change
+        self.interval = interval
+        self._mtimes: Dict[str, float] = {path: self._mtime(path) for path in self.paths}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return 0.0
+
+    def check(self):
+        """检查一次所有配置文件"""
+        for path in self.paths:
+            mtime = self._mtime(path)
+            if mtime == self._mtimes[path]:
+                continue
+
+            try:
+                cfg = load_profile(path)
+                errors = validate_config(cfg)
+            except Exception as e:
+                errors = [str(e)]
+            if errors:
+                # 配置无效时保留旧配置，文件再次修改后重新检查
+                logger.error(f"❌ 配置文件 {path} 无效，继续使用旧配置: {'; '.join(errors)}")
+                self._mtimes[path] = mtime
+                continue
+
+            try:
+                applied = self.on_change(path, cfg)
+            except Exception as e:
+                logger.error(f"❌ 配置文件 {path} 未能应用，继续使用旧配置: {e}")
+                self._mtimes[path] = mtime
+                continue
+            if applied:
+                self._mtimes[path] = mtime
+                logger.info(f"🔄 已重新加载配置: {path}")
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"检查配置文件时出错: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='config-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
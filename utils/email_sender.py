@@ -4,10 +4,12 @@
 
 import smtplib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Tuple
 from datetime import datetime
 import os
+import time
 
 from utils.logger import APILogger
 
@@ -15,6 +17,85 @@ logger = logging.getLogger(__name__)
 api_logger = APILogger("Email")
 
 
+def open_smtp(host: str, port: int, use_ssl: bool):
+    """建立SMTP连接"""
+    return smtplib.SMTP_SSL(host, port) if use_ssl else smtplib.SMTP(host, port)
+
+
+class SMTPSession:
+    """可复用的已认证SMTP会话，一次登录发送多封邮件"""
+    
+    # 建立连接的工厂 (host, port, use_ssl) -> 连接，录制和回放时替换为代理或本地替身
+    factory: Callable = staticmethod(open_smtp)
+    
+    def __init__(self, host: str, port: int, username: str, password: str, max_messages: int = 50,
+                 starttls: bool = True):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_messages = max(1, max_messages)
+        self.starttls = starttls
+        
+        self._server = None
+        self._sent_on_connection = 0
+    
+    @property
+    def connected(self) -> bool:
+        return self._server is not None
+    
+    def _connect(self):
+        """建立连接并登录"""
+        # 支持163邮箱SSL连接，其他邮箱TLS连接
+        use_ssl = self.host == 'smtp.163.com' and self.port == 465
+        server = self.factory(self.host, self.port, use_ssl)
+        try:
+            if not use_ssl and self.starttls:
+                server.starttls()
+            server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self._sent_on_connection = 0
+    
+    def close(self):
+        """关闭连接"""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+    
+    def send(self, sender: str, recipient: str, message: str):
+        """发送一封邮件，连接达到上限时轮换，被服务器断开时重连一次"""
+        if self._server is not None and self._sent_on_connection >= self.max_messages:
+            self.close()
+        if self._server is None:
+            self._connect()
+        
+        try:
+            self._server.sendmail(sender, recipient, message)
+        except smtplib.SMTPServerDisconnected:
+            # 断开的连接也要关闭，释放套接字
+            try:
+                self._server.close()
+            except Exception:
+                pass
+            self._server = None
+            self._connect()
+            self._server.sendmail(sender, recipient, message)
+        self._sent_on_connection += 1
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 class EmailSender:
     """邮件发送器"""
     
@@ -23,6 +104,12 @@ class EmailSender:
         self.port = int(os.getenv('EMAIL_PORT', 587))
         self.username = os.getenv('EMAIL_USER')
         self.password = os.getenv('EMAIL_PASSWORD')
+        # 仅用于本地测试SMTP服务器，正式邮箱必须使用TLS
+        self.starttls = os.getenv('EMAIL_STARTTLS', 'TRUE').lower() == 'true'
+        
+        # 每个连接最多发送的邮件数，以及并行发送的连接数
+        self.max_per_connection = int(os.getenv('EMAIL_MAX_PER_CONNECTION', 50))
+        self.max_workers = int(os.getenv('EMAIL_MAX_WORKERS', 1))
         
         self.max_paper_per_group = max_paper_per_group
         
@@ -30,14 +117,14 @@ class EmailSender:
         recipient_str = os.getenv('RECIPIENT_EMAIL', '')
         self.recipient_emails = [email.strip() for email in recipient_str.split(',') if email.strip()]
     
-    def format_email_content(self, papers: List[Dict], ai_summarizer) -> str:
+    def format_email_content(self, papers: List[Dict], ai_summarizer, max_papers: Optional[int] = None) -> str:
         """格式化邮件内容"""
         if not papers:
             return "今日未发现相关论文。"
         
         date_str = datetime.now().strftime('%Y-%m-%d')
         # 从config读取最大论文数
-        max_papers = min(len(papers), self.max_paper_per_group)
+        max_papers = min(len(papers), max_papers or self.max_paper_per_group)
         total_count = max_papers
         
         # 邮件头部
@@ -55,15 +142,17 @@ class EmailSender:
             if paper['abstract']:
                 email_parts.append(f"📝 摘要:\n{paper['abstract']}")
             
-            # AI总结
-            logger.info(f"[{i}/{total_count}] 正在总结论文: {paper['title'][:50]}...")
-            ai_summary = ai_summarizer.summarize_paper(paper['title'], paper['abstract'])
-            
-            # 检查是否失败
-            if ai_summary.get('_ai_failed'):
-                logger.warning(f"[{i}/{total_count}] ⚠️ AI总结失败，使用基础总结")
-            else:
-                logger.info(f"[{i}/{total_count}] 论文总结完成 ✅")
+            # AI总结（已在总结阶段完成的直接复用）
+            ai_summary = paper.get('ai_summary')
+            if ai_summary is None:
+                logger.info(f"[{i}/{total_count}] 正在总结论文: {paper['title'][:50]}...")
+                ai_summary = ai_summarizer.summarize_paper(paper['title'], paper['abstract'])
+                
+                # 检查是否失败
+                if ai_summary.get('_ai_failed'):
+                    logger.warning(f"[{i}/{total_count}] ⚠️ AI总结失败，使用基础总结")
+                else:
+                    logger.info(f"[{i}/{total_count}] 论文总结完成 ✅")
             
             if ai_summary['core_problem']:
                 email_parts.append(f"🎯 核心问题：\n{ai_summary['core_problem']}")
@@ -89,6 +178,10 @@ class EmailSender:
             if paper['link']:
                 email_parts.append(f"🔗 ArXiv 链接: \n{paper['link']}")
             
+            # 折叠的近似重复论文
+            if paper.get('near_duplicates'):
+                email_parts.append("🔁 相似论文: \n" + '\n'.join(paper['near_duplicates']))
+            
             email_parts.append("")  # 空行分隔
         
         # 状态更新
@@ -110,67 +203,124 @@ class EmailSender:
         
         return '\n'.join(email_parts)
     
+    def render_digest(self, papers: Dict[str, List[Dict]], ai_summarizer=None,
+                      max_papers: Optional[int] = None) -> Tuple[str, str]:
+        """渲染分组摘要邮件，返回 (主题, 正文)"""
+        email_body = ""
+        for group_name, group_papers in papers.items():
+            email_body_ = self.format_email_content(group_papers, ai_summarizer, max_papers=max_papers)
+            if group_papers:
+                email_body += f"\n\n=== Group: {group_name} ===\n\n" + email_body_.strip("\n")
+        
+        date_str = datetime.now().strftime('%Y-%m-%d')
+        subject = f"{date_str} 每日精选 #{len(papers)}"
+        return subject, email_body
+    
+    def send_digests(self, digests: List[Tuple[str, str, str]]) -> List[Tuple[str, Optional[str]]]:
+        """发送个性化摘要 (收件人, 主题, 正文)，相同内容的邮件只构建一次"""
+        messages = {}
+        deliveries = []
+        for recipient_email, subject, body in digests:
+            if (subject, body) not in messages:
+                messages[(subject, body)] = self.build_message(body, subject)
+            deliveries.append((recipient_email, messages[(subject, body)]))
+        
+        results = self.deliver(deliveries)
+        success_count = sum(1 for _, error in results if error is None)
+        logger.info(f"成功发送 {success_count}/{len(deliveries)} 封邮件")
+        return results
+    
     def send_email(self, papers: List[Dict], ai_summarizer=None) -> bool:
         """发送邮件"""
         try:
             # 创建邮件内容
             if isinstance(papers, dict):
-                email_body = ""
-                for group_name, group_papers in papers.items():
-                    email_body_ = self.format_email_content(group_papers, ai_summarizer)
-                    if group_papers:
-                        email_body += f"\n\n=== Group: {group_name} ===\n\n" + email_body_.strip("\n")
+                subject, email_body = self.render_digest(papers, ai_summarizer)
             else:
                 email_body = self.format_email_content(papers, ai_summarizer)
-                
-            date_str = datetime.now().strftime('%Y-%m-%d')
-            subject = f"{date_str} 每日精选 #{len(papers)}"
+                date_str = datetime.now().strftime('%Y-%m-%d')
+                subject = f"{date_str} 每日精选 #{len(papers)}"
+            
+            # 邮件只构建一次，按收件人只替换 To 头
+            message = self.build_message(email_body, subject)
+            results = self.deliver([(r, message) for r in self.recipient_emails])
+            success_count = sum(1 for _, error in results if error is None)
+            
+            logger.info(f"成功发送 {success_count}/{len(self.recipient_emails)} 封邮件")
+            return success_count > 0
             
-            # 发送给所有收件人
-            success_count = 0
-            for recipient_email in self.recipient_emails:
+        except Exception as e:
+            logger.error(f"邮件发送失败: {e}")
+            return False
+    
+    def build_message(self, body: str, subject: str) -> str:
+        """构建邮件（不含To头），所有收件人共用"""
+        msg = MIMEText(body, 'plain', 'utf-8')
+        msg['From'] = self.username
+        msg['Subject'] = subject
+        return msg.as_string()
+    
+    @staticmethod
+    def _with_recipient(message: str, recipient: str) -> str:
+        """为共用的邮件加上收件人头"""
+        return f"To: {recipient}\n{message}"
+    
+    def _send_batch(self, deliveries: List[Tuple[str, str]]) -> List[Tuple[str, Optional[str]]]:
+        """在同一个SMTP会话中依次发送"""
+        results = []
+        with SMTPSession(self.host, self.port, self.username, self.password,
+                         max_messages=self.max_per_connection, starttls=self.starttls) as session:
+            for i, (recipient_email, message) in enumerate(deliveries):
+                started = time.time()
                 try:
-                    # 创建邮件对象
-                    msg = MIMEText(email_body, 'plain', 'utf-8')
-                    msg['From'] = self.username
-                    msg['To'] = recipient_email
-                    msg['Subject'] = subject
-                    
-                    # 发送邮件 - 支持163邮箱SSL连接
-                    if self.host == 'smtp.163.com' and self.port == 465:
-                        # 163邮箱SSL连接
-                        with smtplib.SMTP_SSL(self.host, self.port) as server:
-                            server.login(self.username, self.password)
-                            server.sendmail(self.username, recipient_email, msg.as_string())
-                    else:
-                        # 其他邮箱TLS连接
-                        with smtplib.SMTP(self.host, self.port) as server:
-                            server.starttls()
-                            server.login(self.username, self.password)
-                            server.sendmail(self.username, recipient_email, msg.as_string())
+                    session.send(self.username, recipient_email, self._with_recipient(message, recipient_email))
                     
                     # 记录成功
                     api_logger.log_email_send(
                         recipient=recipient_email,
-                        success=True
+                        success=True,
+                        latency=time.time() - started,
+                        size=len(message)
                     )
                     logger.info(f"邮件发送成功: {recipient_email}")
-                    success_count += 1
+                    results.append((recipient_email, None))
                 except Exception as e:
                     # 记录失败
                     api_logger.log_email_send(
                         recipient=recipient_email,
                         success=False,
-                        error=str(e)
+                        error=str(e),
+                        latency=time.time() - started
                     )
                     logger.error(f"发送邮件到 {recipient_email} 失败: {e}")
-            
-            logger.info(f"成功发送 {success_count}/{len(self.recipient_emails)} 封邮件")
-            return success_count > 0
-            
-        except Exception as e:
-            logger.error(f"邮件发送失败: {e}")
-            return False
+                    results.append((recipient_email, str(e)))
+                    
+                    # 无法建立连接或登录时，剩余收件人不再重复登录，避免触发服务商限流
+                    if not session.connected:
+                        for rest_email, _ in deliveries[i + 1:]:
+                            api_logger.log_email_send(recipient=rest_email, success=False, error=str(e))
+                            logger.error(f"发送邮件到 {rest_email} 失败: {e}")
+                            results.append((rest_email, str(e)))
+                        break
+        return results
+    
+    def deliver(self, deliveries: List[Tuple[str, str]]) -> List[Tuple[str, Optional[str]]]:
+        """发送 (收件人, 邮件) 列表，按输入顺序返回 (收件人, 错误信息)，成功时错误信息为None"""
+        if not deliveries:
+            return []
+        
+        workers = min(self.max_workers, len(deliveries))
+        if workers <= 1:
+            return self._send_batch(deliveries)
+        
+        # 每个线程持有一个独立会话，按轮转方式分配收件人，结果按输入顺序返回
+        batches = [deliveries[i::workers] for i in range(workers)]
+        results = [None] * len(deliveries)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for worker, batch_results in enumerate(executor.map(self._send_batch, batches)):
+                for j, result in enumerate(batch_results):
+                    results[worker + j * workers] = result
+        return results
     
     def send_test_email(self) -> bool:
         """发送测试邮件"""
@@ -188,43 +338,9 @@ class EmailSender:
 arXiv机器人
             """.strip()
             
-            # 发送给所有收件人
-            success_count = 0
-            for recipient_email in self.recipient_emails:
-                try:
-                    msg = MIMEText(test_body, 'plain', 'utf-8')
-                    msg['From'] = self.username
-                    msg['To'] = recipient_email
-                    msg['Subject'] = "[arXiv机器人] 测试邮件"
-                    
-                    # 发送测试邮件 - 支持163邮箱SSL连接
-                    if self.host == 'smtp.163.com' and self.port == 465:
-                        # 163邮箱SSL连接
-                        with smtplib.SMTP_SSL(self.host, self.port) as server:
-                            server.login(self.username, self.password)
-                            server.sendmail(self.username, recipient_email, msg.as_string())
-                    else:
-                        # 其他邮箱TLS连接
-                        with smtplib.SMTP(self.host, self.port) as server:
-                            server.starttls()
-                            server.login(self.username, self.password)
-                            server.sendmail(self.username, recipient_email, msg.as_string())
-                    
-                    # 记录成功
-                    api_logger.log_email_send(
-                        recipient=recipient_email,
-                        success=True
-                    )
-                    logger.info(f"测试邮件发送成功: {recipient_email}")
-                    success_count += 1
-                except Exception as e:
-                    # 记录失败
-                    api_logger.log_email_send(
-                        recipient=recipient_email,
-                        success=False,
-                        error=str(e)
-                    )
-                    logger.error(f"发送测试邮件到 {recipient_email} 失败: {e}")
+            message = self.build_message(test_body, "[arXiv机器人] 测试邮件")
+            results = self.deliver([(r, message) for r in self.recipient_emails])
+            success_count = sum(1 for _, error in results if error is None)
             
             logger.info(f"成功发送 {success_count}/{len(self.recipient_emails)} 封测试邮件")
             return success_count > 0
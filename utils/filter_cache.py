@@ -0,0 +1,96 @@
+"""
+筛选结果缓存模块
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from utils.paper_utils import utc_now
+
+logger = logging.getLogger(__name__)
+
+
+class FilterCache:
+    """筛选结果缓存：按 arXiv编号+版本 和关键词组指纹保存匹配结果
+
+    每篇论文一行，值为 {组指纹: [得分, 命中关键词] 或 None(命中排除词)}。
+    论文内容和组配置都没变时直接复用结果，只有新论文或修改过的组需要重新计算。
+    seen_at 为最近一次读写该行的时间，超过 retention_days 未再出现的论文（已移出爬取窗口）在打开时删除；
+    修改关键词后旧指纹的结果在该行重写时丢弃，其余随整行过期删除。
+    """
+
+    def __init__(self, path: str = 'output/filter_cache.sqlite', retention_days: float = 0):
+        self.path = path
+        self.retention_days = retention_days
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS filter_results ("
+            "paper_key TEXT PRIMARY KEY, results TEXT NOT NULL, seen_at TEXT NOT NULL DEFAULT '')"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(filter_results)")]
+        if 'seen_at' not in columns:
+            # 旧版本的缓存没有 seen_at，按当前时间补齐
+            self._conn.execute("ALTER TABLE filter_results ADD COLUMN seen_at TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("UPDATE filter_results SET seen_at = ?", (self._now(),))
+        self._conn.execute("CREATE INDEX IF NOT EXISTS filter_results_seen_at ON filter_results (seen_at)")
+        self._conn.commit()
+        if retention_days:
+            self._prune((utc_now() - timedelta(days=retention_days)).strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+    @staticmethod
+    def _now() -> str:
+        return utc_now().strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def get_many(self, paper_keys: Iterable[str]) -> Dict[str, Dict[str, Optional[List]]]:
+        """批量读取缓存结果，并刷新命中行的 seen_at"""
+        paper_keys = list(paper_keys)
+        found = {}
+        now = self._now()
+        with self._lock:
+            # SQLite 单条语句的参数个数有限，分批查询
+            for i in range(0, len(paper_keys), 500):
+                chunk = paper_keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT paper_key, results FROM filter_results WHERE paper_key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for paper_key, results in rows:
+                    found[paper_key] = json.loads(results)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE filter_results SET seen_at = ? WHERE paper_key IN ({','.join('?' * len(chunk))})",
+                        [now] + chunk,
+                    )
+            self._conn.commit()
+        return found
+
+    def put_many(self, entries: Dict[str, Dict[str, Optional[List]]]):
+        """批量写入缓存结果（整行覆盖）"""
+        if not entries:
+            return
+        now = self._now()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO filter_results (paper_key, results, seen_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(results, ensure_ascii=False), now) for key, results in entries.items()],
+            )
+            self._conn.commit()
+
+    def _prune(self, before: str):
+        """删除 before 之前最后一次出现的论文"""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM filter_results WHERE seen_at < ?", (before,)).rowcount
+            self._conn.commit()
+        if deleted:
+            logger.info(f"筛选缓存清理: 删除 {deleted} 条过期结果")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,169 @@
+"""
+全文提取模块
+
+只为选中要总结的论文下载PDF并提取正文，挑出方法、实验等章节交给AI总结。
+下载在线程中进行，PDF解析在有界的进程池中进行，不受GIL限制；提取结果按arXiv编号+版本缓存到磁盘。
+总结时每篇论文最多等待 wait 秒，超时、下载失败或未安装 pypdf 时退回到只用摘要，不会阻塞或中断运行。
+"""
+
+import importlib.util
+import io
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+from utils.metrics import metrics
+from utils.paper_utils import paper_version
+from utils.storage import save_text
+
+logger = logging.getLogger(__name__)
+
+# 按优先级排列的章节：方法最重要，其次是引言、结论和实验
+SECTION_PATTERNS = [
+    ('method', r'method(?:s|ology)?|approach|proposed method|framework|our model'),
+    ('introduction', r'introduction'),
+    ('conclusion', r'conclusions?|discussion|summary'),
+    ('experiments', r'experiments?|experimental results|results|evaluation'),
+]
+# 章节标题：可带编号（"3", "3.1", "III."），独占一行
+HEADING = re.compile(
+    r'^\s*(?:\d+(?:\.\d+)*\.?|[IVX]+\.)?\s*(' + '|'.join(pattern for _, pattern in SECTION_PATTERNS) + r')\s*$',
+    re.IGNORECASE | re.MULTILINE,
+)
+ANY_HEADING = re.compile(r'^\s*(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s+[A-Z][^\n]{0,60}$', re.MULTILINE)
+
+
+def extract_text(pdf: bytes, max_pages: int = 30) -> str:
+    """解析PDF正文（在进程池中运行）"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(pdf))
+    pages = reader.pages[:max_pages]
+    return '\n'.join(page.extract_text() or '' for page in pages)
+
+
+def select_sections(text: str, max_chars: int) -> str:
+    """按优先级挑选章节，总长度不超过 max_chars；找不到章节标题时取正文开头"""
+    headings = list(ANY_HEADING.finditer(text))
+    sections = {}
+    for match in HEADING.finditer(text):
+        title = match.group(1).lower()
+        name = next(name for name, pattern in SECTION_PATTERNS if re.fullmatch(pattern, title, re.IGNORECASE))
+        if name in sections:
+            continue
+        # 章节到下一个编号标题为止
+        end = next((h.start() for h in headings if h.start() > match.end()), len(text))
+        sections[name] = re.sub(r'\s+', ' ', text[match.end():end]).strip()
+
+    if not sections:
+        return re.sub(r'\s+', ' ', text).strip()[:max_chars]
+
+    selected = []
+    budget = max_chars
+    for name, _ in SECTION_PATTERNS:
+        body = sections.get(name)
+        if not body or budget <= 0:
+            continue
+        # 每个章节最多占一半额度，给后面的章节留出空间
+        part = body[:max(budget // 2, min(budget, 500))]
+        selected.append(f"[{name}] {part}")
+        budget -= len(part)
+    return '\n'.join(selected)
+
+
+class FullTextExtractor:
+    """选中论文的全文提取器
+
+    prefetch() 立即返回，下载和提取在后台进行；sections() 取某篇论文的章节节选，最多等待 wait 秒。
+    """
+
+    def __init__(self, url_template: str, cache_dir: str, workers: int = 2,
+                 max_chars: int = 6000, wait: float = 30, max_pages: int = 30):
+        self.url_template = url_template
+        self.cache_dir = cache_dir
+        self.workers = max(1, workers)
+        self.max_chars = max_chars
+        self.wait = wait
+        self.max_pages = max_pages
+        self.enabled = importlib.util.find_spec('pypdf') is not None
+        if not self.enabled:
+            logger.warning("⚠️ 未安装 pypdf，跳过全文提取，总结只使用摘要")
+
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._downloads = None
+        self._pool = None
+
+    def _cache_path(self, key: str) -> str:
+        # 旧格式编号含 '/'（如 cs/0112017v1）
+        return os.path.join(self.cache_dir, key.replace('/', '_') + '.txt')
+
+    def prefetch(self, papers: List[Dict]):
+        """在后台提取这些论文的全文，已缓存或已提交的论文跳过"""
+        if not self.enabled:
+            return
+        with self._lock:
+            for paper in papers:
+                key = paper_version(paper)
+                if key in self._futures:
+                    continue
+                if self._downloads is None:
+                    self._downloads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fulltext')
+                    # spawn 启动的子进程不继承日志等后台线程的锁
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                self._futures[key] = self._downloads.submit(self._fetch, paper, key)
+
+    def _fetch(self, paper: Dict, key: str) -> Optional[str]:
+        path = self._cache_path(key)
+        if os.path.exists(path):
+            metrics.inc('fulltext_total', status='cached')
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+
+        import requests
+
+        url = self.url_template.format(arxiv_id=paper['arxiv_id'], version=paper.get('version', ''), key=key)
+        try:
+            with metrics.stage('fulltext'):
+                response = requests.get(url, timeout=60)
+                response.raise_for_status()
+                text = self._pool.submit(extract_text, response.content, self.max_pages).result()
+        except Exception as e:
+            metrics.inc('fulltext_total', status='failed')
+            logger.warning(f"⚠️ 全文提取失败 {key}: {e}")
+            return None
+
+        save_text(path, text)
+        metrics.inc('fulltext_total', status='extracted')
+        return text
+
+    def sections(self, paper: Dict) -> Optional[str]:
+        """论文的章节节选；未提交、失败或等待超时时返回None"""
+        future = self._futures.get(paper_version(paper))
+        if future is None:
+            return None
+        try:
+            text = future.result(timeout=self.wait)
+        except FutureTimeoutError:
+            logger.warning(f"⚠️ 等待全文超时，只使用摘要: {paper['title'][:50]}")
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ 全文提取失败，只使用摘要: {e}")
+            return None
+        return select_sections(text, self.max_chars) if text else None
+
+    def close(self):
+        """取消未开始的提取并关闭进程池，下次 prefetch 时重新创建"""
+        with self._lock:
+            self._futures = {}
+            downloads, pool = self._downloads, self._pool
+            self._downloads = self._pool = None
+        if downloads is not None:
+            downloads.shutdown(wait=False, cancel_futures=True)
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -2,10 +2,15 @@
 美化的日志输出模块
 """
 
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
 from datetime import datetime
-from typing import Optional
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Callable, List, Optional
 
 
 class SimpleFormatter(logging.Formatter):
@@ -43,112 +48,147 @@ class MarkdownFormatter(logging.Formatter):
         return log_msg
 
 
+# API调用记录只写入 setup_api_log 配置的JSONL文件，不进入主日志和控制台
+logging.getLogger('api').propagate = False
+logging.getLogger('api').addHandler(logging.NullHandler())
+
+
+class JSONLFormatter(logging.Formatter):
+    """结构化日志格式化器：每条记录一行JSON"""
+    
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'logger': record.name,
+            'level': record.levelname,
+            'event': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """有界队列日志处理器：调用线程只负责入队，队列满时丢弃并计数，不阻塞业务线程"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record):
+        # 格式化留给后台线程；记录中只有字符串和数字字段，无需复制
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BackgroundListener(QueueListener):
+    """后台写日志线程，退出时等待队列写完"""
+    
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def async_handler(handler: logging.Handler, queue_size: int = 10000) -> BoundedQueueHandler:
+    """把处理器放到后台线程执行，返回挂到 logger 上的队列处理器"""
+    queue_handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size))
+    listener = BackgroundListener(queue_handler.queue, handler, respect_handler_level=True)
+    listener.start()
+    
+    def stop():
+        listener.stop()
+        if queue_handler.dropped:
+            handler.handle(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"日志队列已满，丢弃了 {queue_handler.dropped} 条记录",
+            }))
+        handler.close()
+    
+    atexit.register(stop)
+    return queue_handler
+
+
 class APILogger:
-    """API调用专用日志记录器"""
+    """API调用专用日志记录器
+    
+    每次调用记录一条结构化JSONL记录（运行ID、耗时、数据大小等），由 setup_api_log 配置的后台线程写入文件。
+    """
+    
+    # 监听钩子：每次记录时以 (事件名, **字段) 调用，用于统计运行指标
+    _listeners: List[Callable] = []
+    
+    # 当前运行ID，写入每条记录
+    run_id: Optional[str] = None
     
     def __init__(self, name: str = "API"):
-        self.logger = logging.getLogger(name)
+        self.logger = logging.getLogger(f"api.{name}")
         self.logger.setLevel(logging.DEBUG)
     
+    @classmethod
+    def add_listener(cls, callback: Callable):
+        """注册监听钩子"""
+        if callback not in cls._listeners:
+            cls._listeners.append(callback)
+    
+    def _notify(self, event: str, **fields):
+        for callback in self._listeners:
+            try:
+                callback(event, **fields)
+            except Exception:
+                logging.getLogger(__name__).debug(f"监听钩子出错: {event}", exc_info=True)
+    
+    def _record(self, event: str, level: int = logging.INFO, **fields):
+        """写入一条结构化记录，latency 统一保留到毫秒"""
+        if fields.get('latency') is not None:
+            fields['latency'] = round(fields['latency'], 3)
+        fields = {key: value for key, value in fields.items() if value is not None}
+        self.logger.log(level, event, extra={'fields': dict(fields, run_id=self.run_id)})
+    
     def log_api_call(self, api_name: str, endpoint: str, method: str = "GET", 
                      status: Optional[str] = None, response_data: Optional[dict] = None,
-                     error: Optional[str] = None):
-        """记录API调用"""
+                     error: Optional[str] = None, latency: Optional[float] = None,
+                     size: Optional[int] = None):
+        """记录API调用，latency 为请求耗时（秒），size 为响应字节数"""
+        self._notify('api_call', api_name=api_name, status=status, latency=latency)
+        if not status:
+            return
         
-        # 只记录详细输出到文件
-        if status:
-            lines = [
-                f"### 🔌 API调用: {api_name}",
-                f"",
-                f"- **方法**: `{method}`",
-                f"- **端点**: `{endpoint}`",
-            ]
-            
-            if status == "success":
-                lines.append(f"- **状态**: ✅ 成功")
-                if response_data:
-                    response_str = str(response_data)
-                    if len(response_str) > 500:
-                        response_str = response_str[:500] + "..."
-                    lines.append(f"- **响应**: ```json\n{response_str}\n```")
-            elif status == "failed":
-                lines.append(f"- **状态**: ❌ 失败")
-                if error:
-                    lines.append(f"- **错误**: `{error}`")
-            else:
-                lines.append(f"- **状态**: ⏳ 进行中...")
-            
-            lines.append("")
-            detailed_message = "\n".join(lines)
-            
-            # 只记录到文件
-            for handler in self.logger.handlers:
-                if isinstance(handler, logging.FileHandler):
-                    handler.emit(logging.LogRecord(
-                        self.logger.name, logging.INFO, "", 0, detailed_message,
-                        (), None))
+        self._record(
+            'api_call', logging.INFO if status == "success" else logging.ERROR,
+            api=api_name, method=method, endpoint=endpoint, status=status, latency=latency, size=size,
+            response=str(response_data)[:500] if response_data else None,
+            error=error,
+        )
     
     def log_openai_request(self, model: str, prompt_preview: str, success: bool = False, 
-                          error: Optional[str] = None, response_preview: Optional[str] = None):
-        """记录OpenAI请求"""
-        
-        # 只记录详细输出到文件
-        lines = [
-            f"### 🤖 AI总结请求",
-            f"",
-            f"- **模型**: `{model}`",
-        ]
-        
-        # 截断过长的提示词预览
-        preview = prompt_preview[:200] if len(prompt_preview) > 200 else prompt_preview
-        lines.append(f"- **提示词预览**: ```\n{preview}...\n```")
-        
-        if success:
-            lines.append(f"- **状态**: ✅ 成功")
-            if response_preview:
-                # 截断过长的响应预览
-                resp_preview = response_preview[:300] if len(response_preview) > 300 else response_preview
-                lines.append(f"- **响应预览**: ```\n{resp_preview}\n```")
-        else:
-            lines.append(f"- **状态**: ❌ 失败")
-            if error:
-                # 截断过长的错误信息
-                error_short = error[:300] if len(error) > 300 else error
-                lines.append(f"- **错误**: `{error_short}`")
-        
-        lines.append("")
-        detailed_message = "\n".join(lines)
+                          error: Optional[str] = None, response_preview: Optional[str] = None,
+                          latency: Optional[float] = None):
+        """记录OpenAI请求，latency 为请求耗时（秒）"""
+        self._notify('openai_request', model=model, success=success, latency=latency)
         
-        # 只记录到文件
-        for handler in self.logger.handlers:
-            if isinstance(handler, logging.FileHandler):
-                handler.emit(logging.LogRecord(
-                    self.logger.name, logging.INFO, "", 0, detailed_message,
-                    (), None))
-    
-    def log_email_send(self, recipient: str, success: bool = False, error: Optional[str] = None):
-        """记录邮件发送"""
-        
-        # 文件：详细输出
-        lines = [
-            f"### 📧 邮件发送",
-            f"",
-            f"- **收件人**: `{recipient}`",
-            f"- **状态**: {'✅ 成功' if success else '❌ 失败'}",
-        ]
-        
-        if error:
-            lines.append(f"- **错误**: `{error}`")
-        
-        lines.append("")
-        detailed_message = "\n".join(lines)
+        # 只截断预览，大小按完整内容记录
+        self._record(
+            'openai_request', logging.INFO if success else logging.ERROR,
+            model=model, success=success, latency=latency,
+            prompt_chars=len(prompt_preview),
+            response_chars=len(response_preview) if response_preview is not None else None,
+            prompt_preview=prompt_preview[:200],
+            response_preview=response_preview[:300] if response_preview else None,
+            error=error[:300] if error else None,
+        )
+    
+    def log_email_send(self, recipient: str, success: bool = False, error: Optional[str] = None,
+                       latency: Optional[float] = None, size: Optional[int] = None):
+        """记录邮件发送，latency 为发送耗时（秒），size 为邮件字节数"""
+        self._notify('email_send', recipient=recipient, success=success, latency=latency)
         
-        # 只记录到文件
-        for handler in self.logger.handlers:
-            if isinstance(handler, logging.FileHandler):
-                handler.emit(logging.LogRecord(
-                    self.logger.name, logging.INFO if success else logging.ERROR, "", 0, detailed_message,
-                    (), None))
+        self._record(
+            'email_send', logging.INFO if success else logging.ERROR,
+            recipient=recipient, success=success, latency=latency, size=size, error=error,
+        )
     
     def log_section(self, title: str, content: str = ""):
         """记录章节标题"""
@@ -170,23 +210,28 @@ class APILogger:
 
 
 def setup_logger(level: str = "INFO"):
-    """设置全局日志"""
-    logging.basicConfig(
-        level=getattr(logging, level),
-        handlers=[
-            # 文件处理器使用详细格式
-            logging.FileHandler('output/arxiv_robot.log', encoding='utf-8'),
-        ]
-    )
+    """设置全局日志，文件写入在后台线程中完成"""
+    os.makedirs('output', exist_ok=True)
+    
+    # 文件处理器使用详细格式
+    file_handler = logging.FileHandler('output/arxiv_robot.log', encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
     
-    # 为文件handler添加详细格式
     root_logger = logging.getLogger()
-    for handler in root_logger.handlers:
-        if isinstance(handler, logging.FileHandler):
-            handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    root_logger.setLevel(getattr(logging, level))
+    root_logger.addHandler(async_handler(file_handler))
     
     # 为控制台添加简化格式
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(SimpleFormatter())
     root_logger.addHandler(console_handler)
 
+
+def setup_api_log(path: str = 'output/api_calls.jsonl', max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5, queue_size: int = 10000):
+    """API调用记录写入JSONL文件，超过 max_bytes 时轮转，保留 backup_count 个历史文件"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(JSONLFormatter())
+    
+    logging.getLogger('api').addHandler(async_handler(file_handler, queue_size))
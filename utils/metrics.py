@@ -0,0 +1,249 @@
+"""
+运行指标模块
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from utils.logger import APILogger
+from utils.storage import save_json, save_text
+
+logger = logging.getLogger(__name__)
+
+# Prometheus 指标名前缀
+PREFIX = 'arxiv_robot'
+
+# 延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# 指标说明，写入 Prometheus 文本文件的 HELP 行
+DESCRIPTIONS = {
+    'stage_seconds': '各阶段实际工作耗时（秒）',
+    'run_duration_seconds': '整次运行耗时（秒）',
+    'run_success': '最近一次运行是否成功',
+    'last_run_timestamp_seconds': '最近一次运行结束时间',
+    'papers_fetched_total': '爬取到的论文数（去重前）',
+    'duplicates_total': '重复论文数',
+    'group_matches': '各关键词组筛选出的论文数',
+    'filter_cache_hits_total': '筛选缓存命中的组结果数',
+    'filter_cache_misses_total': '筛选缓存未命中的组结果数',
+    'arxiv_requests_total': 'arXiv API 请求数',
+    'ai_requests_total': 'AI总结请求数',
+    'ai_failures_total': 'AI总结失败数',
+    'ai_fallbacks_total': 'AI总结失败后退回基础总结的论文数',
+    'fulltext_total': '全文提取数（cached/extracted/failed）',
+    'emails_total': '邮件发送数',
+    'arxiv_latency_seconds': 'arXiv API 请求延迟（秒）',
+    'llm_latency_seconds': 'AI总结请求延迟（秒）',
+    'smtp_latency_seconds': 'SMTP 发送延迟（秒）',
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    escaped = [(key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in items]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(round(value, 6))
+
+
+class Histogram:
+    """累积直方图"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> Dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'count': self.count, 'sum': round(self.sum, 3), 'buckets': buckets}
+
+
+class Metrics:
+    """单次运行的指标：阶段耗时、计数器、最新值和延迟直方图
+
+    进程内共用一个实例（见模块级 metrics），运行结束时导出为JSON报告和 Prometheus 文本文件。
+    API调用、AI总结和邮件发送的延迟与成败通过 APILogger 的监听钩子记录。
+    """
+
+    # 保留最近几次运行的JSON报告
+    KEEP_REPORTS = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._depth = 0
+        # run --profile 时由 utils.profiler 设置，按阶段采集CPU和内存剖析
+        self.profiler = None
+        self.reset()
+
+    def reset(self, run_id: Optional[str] = None):
+        self.run_id = run_id
+        self.started = time.time()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def stage(self, name: str, **labels):
+        """记录阶段耗时，同一阶段多次进入时累加"""
+        started = time.perf_counter()
+        try:
+            if self.profiler is None:
+                yield
+            else:
+                with self.profiler.stage(name, **labels):
+                    yield
+        finally:
+            self.inc('stage_seconds', time.perf_counter() - started, stage=name, **labels)
+
+    @contextmanager
+    def run(self, run_id: str, output_dir: Optional[str] = None):
+        """一次运行的指标范围；嵌套调用（多配置运行）时只有最外层重置和导出"""
+        with self._lock:
+            self._depth += 1
+            outermost = self._depth == 1
+        if outermost:
+            self.reset(run_id)
+            APILogger.run_id = run_id
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+            if outermost:
+                APILogger.run_id = None
+                self.set('run_duration_seconds', time.time() - self.started)
+                self.set('last_run_timestamp_seconds', time.time())
+                if output_dir:
+                    try:
+                        self.export(output_dir)
+                    except Exception as e:
+                        logger.error(f"⚠️ 写入运行指标失败: {e}")
+
+    def to_dict(self) -> Dict:
+        """JSON运行报告"""
+        def entries(items, convert=lambda value: round(value, 3)):
+            return [
+                {'name': name, 'labels': dict(labels), 'value': convert(value)}
+                for (name, labels), value in sorted(items.items())
+            ]
+
+        with self._lock:
+            return {
+                'run_id': self.run_id,
+                'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'stages': [
+                    dict(labels, seconds=round(seconds, 3))
+                    for (name, labels), seconds in sorted(self.counters.items()) if name == 'stage_seconds'
+                ],
+                'counters': entries({k: v for k, v in self.counters.items() if k[0] != 'stage_seconds'}),
+                'gauges': entries(self.gauges),
+                'histograms': entries(self.histograms, convert=Histogram.to_dict),
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式（node_exporter textfile collector）"""
+        lines = []
+        typed = set()
+
+        def header(name: str, kind: str):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {PREFIX}_{name} {DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                header(name, 'counter' if name.endswith('_total') else 'gauge')
+                lines.append(f"{PREFIX}_{name}{_format_labels(labels)} {_format_value(value)}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                header(name, 'gauge')
+                lines.append(f"{PREFIX}_{name}{_format_labels(labels)} {_format_value(value)}")
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                header(name, 'histogram')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{PREFIX}_{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {cumulative}")
+                lines.append(f"{PREFIX}_{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"{PREFIX}_{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                lines.append(f"{PREFIX}_{name}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, output_dir: str):
+        """写入 run-<run_id>.json 和 arxiv_robot.prom"""
+        report_path = os.path.join(output_dir, f"run-{self.run_id}.json")
+        save_json(report_path, self.to_dict())
+        save_text(os.path.join(output_dir, f"{PREFIX}.prom"), self.to_prometheus())
+        reports = sorted(name for name in os.listdir(output_dir) if name.startswith('run-') and name.endswith('.json'))
+        for name in reports[:-self.KEEP_REPORTS]:
+            os.remove(os.path.join(output_dir, name))
+        logger.info(f"📊 运行指标已写入 {report_path}")
+
+    def on_api_event(self, event: str, **fields):
+        """APILogger 监听钩子"""
+        latency = fields.get('latency')
+        if event == 'api_call':
+            self.inc('arxiv_requests_total', status=fields.get('status') or 'unknown')
+            if latency is not None:
+                self.observe('arxiv_latency_seconds', latency)
+        elif event == 'openai_request':
+            self.inc('ai_requests_total')
+            if not fields.get('success'):
+                self.inc('ai_failures_total')
+            if latency is not None:
+                self.observe('llm_latency_seconds', latency)
+        elif event == 'email_send':
+            self.inc('emails_total', status='success' if fields.get('success') else 'failed')
+            if latency is not None:
+                self.observe('smtp_latency_seconds', latency)
+
+
+metrics = Metrics()
+APILogger.add_listener(metrics.on_api_event)
@@ -0,0 +1,276 @@
+"""
+近似重复检测模块
+
+同一工作的伴生论文、会议/研讨会版本等摘要几乎相同的论文会各占一个摘要名额、各调用一次AI总结。
+对标题+摘要的词 shingle 计算 MinHash 签名，按 LSH 分段分桶：只有至少一段完全相同的论文才比较签名，
+估计的 Jaccard 相似度达到阈值即视为同一簇，每簇只保留一篇代表论文，不做两两比较。
+签名和分桶持久化到 SQLite，新论文按桶索引查找以前运行中见过的相似论文，查找耗时与历史论文数无关。
+"""
+
+import hashlib
+import logging
+import os
+import random
+import re
+import sqlite3
+import zlib
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from utils.paper_utils import paper_id, utc_now
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+# 16 段 × 4 行：Jaccard 0.8 的论文成为候选的概率约 99.98%，候选再按签名核对
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+# 大于 2^32 的素数，哈希值为 32 位
+PRIME = 4294967311
+
+_rng = random.Random(20240101)
+PERMUTATIONS = [(_rng.randrange(1, PRIME), _rng.randrange(0, PRIME)) for _ in range(NUM_PERM)]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    arxiv_id TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    canonical TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    seen_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signatures_seen_at ON signatures (seen_at);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    arxiv_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, arxiv_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bands_arxiv_id ON bands (arxiv_id);
+"""
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """小写后按词切分，返回相邻 size 个词的哈希集合（zlib.crc32，跨进程稳定）"""
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+
+def minhash(hashes: set) -> array:
+    """MinHash 签名：每个置换下的最小哈希值"""
+    if not hashes:
+        return array('Q', [PRIME] * NUM_PERM)
+    return array('Q', [min([(a * x + b) % PRIME for x in hashes]) for a, b in PERMUTATIONS])
+
+
+def paper_signature(paper: Dict) -> array:
+    return minhash(shingles(f"{paper['title']} {paper['abstract']}"))
+
+
+def band_buckets(signature: array) -> List[Tuple[int, int]]:
+    """每段的 (段号, 桶)，桶为该段取值的 64 位摘要（有符号，便于存入 SQLite）"""
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(),
+                                              digest_size=8).digest(), 'big', signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a: array, b: array) -> float:
+    """两个签名估计的 Jaccard 相似度"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+class DuplicateTracker:
+    """流式模式下的增量检测：只在内存中记录已提交总结的论文签名
+
+    筛选阶段在提交预先总结前调用 seen()，与已提交的论文近似重复时不再调用AI总结；
+    运行结束后仍由 NearDuplicateIndex.collapse() 决定每簇的代表论文。
+    """
+
+    def __init__(self, threshold: float = 0.8):
+        self.threshold = threshold
+        self._signatures: Dict[str, array] = {}
+        self._buckets: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+
+    def seen(self, paper: Dict) -> bool:
+        """论文与已记录的论文近似重复时返回True，否则记录该论文并返回False"""
+        key = paper_id(paper)
+        if key in self._signatures:
+            return True
+        signature = paper_signature(paper)
+        paper_buckets = band_buckets(signature)
+        candidates = {other for bucket in paper_buckets for other in self._buckets.get(bucket, ())}
+        if any(similarity(signature, self._signatures[other]) >= self.threshold for other in candidates):
+            return True
+        self._signatures[key] = signature
+        for bucket in paper_buckets:
+            self._buckets[bucket].append(key)
+        return False
+
+
+class NearDuplicateIndex:
+    """持久化的 MinHash/LSH 索引"""
+
+    def __init__(self, path: str = 'output/near_duplicates.sqlite', threshold: float = 0.8,
+                 retention_days: int = 180):
+        self.path = path
+        self.threshold = threshold
+        self.retention_days = retention_days
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def _stored(self, keys: Iterable[str]) -> Dict[str, Tuple[str, str, array]]:
+        """已保存的 {arxiv编号: (版本, 代表论文, 签名)}"""
+        keys = list(keys)
+        result = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT arxiv_id, version, canonical, signature FROM signatures "
+                f"WHERE arxiv_id IN ({','.join('?' * len(chunk))})", chunk)
+            for key, version, canonical, blob in rows:
+                signature = array('Q')
+                signature.frombytes(blob)
+                result[key] = (version, canonical, signature)
+        return result
+
+    def _candidates(self, buckets: List[Tuple[int, int]]) -> set:
+        """与任一段同桶的历史论文"""
+        rows = self._conn.execute(
+            "SELECT DISTINCT arxiv_id FROM bands WHERE " + ' OR '.join(['(band = ? AND bucket = ?)'] * len(buckets)),
+            [value for bucket in buckets for value in bucket])
+        return {row[0] for row in rows}
+
+    def signatures(self, papers: List[Dict]) -> Dict[str, array]:
+        """论文签名，版本未变的论文复用已保存的签名"""
+        stored = self._stored(paper_id(paper) for paper in papers)
+        result = {}
+        for paper in papers:
+            key = paper_id(paper)
+            cached = stored.get(key)
+            if cached is not None and cached[0] == paper.get('version', ''):
+                result[key] = cached[2]
+            else:
+                result[key] = paper_signature(paper)
+        return result
+
+    def collapse(self, filtered_papers: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        """把每簇近似重复论文折叠为一篇代表论文
+
+        代表论文为簇内得分最高的论文（同分时优先已有总结的论文，再取发表较晚的版本），其余论文的链接记入 near_duplicates；
+        与以前运行中的论文相似时记入 duplicate_of，订阅人收到过那篇论文时不再选中。
+        """
+        papers: Dict[str, Dict] = {}
+        scores: Dict[str, float] = {}
+        for group_papers in filtered_papers.values():
+            for paper in group_papers:
+                key = paper_id(paper)
+                papers.setdefault(key, paper)
+                scores[key] = max(scores.get(key, 0), paper.get('relevance_score', 0))
+        if not papers:
+            return filtered_papers
+
+        signatures = self.signatures(list(papers.values()))
+        parent = {key: key for key in papers}
+
+        def find(key: str) -> str:
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        # 本次运行内：同桶的论文核对签名后合并
+        buckets_by_paper = {key: band_buckets(signature) for key, signature in signatures.items()}
+        buckets: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+        for key, paper_buckets in buckets_by_paper.items():
+            candidates = {other for bucket in paper_buckets for other in buckets[bucket]}
+            for other in candidates:
+                if similarity(signatures[key], signatures[other]) >= self.threshold:
+                    parent[find(key)] = find(other)
+            for bucket in paper_buckets:
+                buckets[bucket].append(key)
+
+        # 以前的运行：按桶索引查找候选，记录最早见到的代表论文
+        earlier: Dict[str, str] = {}
+        current = set(papers)
+        for key, paper_buckets in buckets_by_paper.items():
+            candidates = self._candidates(paper_buckets) - current
+            if not candidates:
+                continue
+            for other, (_, canonical, signature) in self._stored(candidates).items():
+                if similarity(signatures[key], signature) >= self.threshold:
+                    root = find(key)
+                    earlier[root] = min(earlier.get(root, canonical), canonical)
+
+        clusters: Dict[str, List[str]] = defaultdict(list)
+        for key in papers:
+            clusters[find(key)].append(key)
+        representative = {}
+        for root, members in clusters.items():
+            best = max(members, key=lambda k: (scores[k], 'ai_summary' in papers[k], papers[k].get('published', '')))
+            for key in members:
+                representative[key] = best
+
+        result = {}
+        for group_name, group_papers in filtered_papers.items():
+            group_keys = {paper_id(paper) for paper in group_papers}
+            kept: Dict[str, Dict] = {}
+            for paper in group_papers:
+                key = paper_id(paper)
+                cluster = find(key)
+                # 代表论文不在该组时，保留该组中排名最前的成员
+                if cluster in kept or (representative[key] in group_keys and representative[key] != key):
+                    continue
+                kept[cluster] = paper
+            for cluster, paper in kept.items():
+                others = [papers[k]['link'] for k in clusters[cluster] if k != paper_id(paper)]
+                if others:
+                    paper['near_duplicates'] = others
+                if cluster in earlier:
+                    paper['duplicate_of'] = earlier[cluster]
+            result[group_name] = list(kept.values())
+
+        self._save(papers, signatures, buckets_by_paper,
+                   {key: earlier.get(find(key), representative[key]) for key in papers})
+        duplicates = len(papers) - len(clusters)
+        if duplicates or earlier:
+            logger.info(f"🔁 近似重复检测: {len(papers)} 篇论文折叠为 {len(clusters)} 簇，"
+                        f"{len(earlier)} 簇与以前的论文相似")
+        return result
+
+    def _save(self, papers: Dict[str, Dict], signatures: Dict[str, array],
+              buckets_by_paper: Dict[str, List[Tuple[int, int]]], canonical: Dict[str, str]):
+        now = utc_now()
+        keys = list(papers)
+        with self._conn:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                self._conn.execute(f"DELETE FROM bands WHERE arxiv_id IN ({','.join('?' * len(chunk))})", chunk)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO signatures (arxiv_id, version, canonical, signature, seen_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(key, papers[key].get('version', ''), canonical[key], signatures[key].tobytes(),
+                  now.strftime('%Y-%m-%dT%H:%M:%SZ')) for key in keys])
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO bands (band, bucket, arxiv_id) VALUES (?, ?, ?)",
+                [(band, bucket, key) for key in keys for band, bucket in buckets_by_paper[key]])
+            if self.retention_days:
+                self._prune((now - timedelta(days=self.retention_days)).strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+    def _prune(self, before: str):
+        """删除超过保留期的签名"""
+        self._conn.execute(
+            "DELETE FROM bands WHERE arxiv_id IN (SELECT arxiv_id FROM signatures WHERE seen_at < ?)", (before,))
+        self._conn.execute("DELETE FROM signatures WHERE seen_at < ?", (before,))
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,178 @@
+"""
+持久化发件箱模块
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, List, Dict, Optional, Tuple
+
+from utils.storage import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+class Outbox:
+    """发件箱：渲染好的邮件先落盘，再按收件人跟踪发送状态并重试"""
+
+    def __init__(self, outbox_dir: str = 'output/outbox', max_attempts: int = 5,
+                 retry_delay: float = 30, max_retry_delay: float = 3600,
+                 on_sent: Optional[Callable[[List[Tuple[str, List[str]]]], None]] = None,
+                 failed_retention_days: float = 30):
+        self.outbox_dir = outbox_dir
+        # 重试次数用尽的邮件，保留 failed_retention_days 天供排查
+        self.failed_dir = os.path.join(outbox_dir, 'failed')
+        self.failed_retention_days = failed_retention_days
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        # 送达回调，参数为 [(收件人, 论文编号列表)]
+        self.on_sent = on_sent
+
+    def _path(self, message_id: str) -> str:
+        return os.path.join(self.outbox_dir, f"{message_id}.json")
+
+    def _load_all(self) -> List[Dict]:
+        return [load_json(path) for path in sorted(glob.glob(os.path.join(self.outbox_dir, '*.json')))]
+
+    def enqueue(self, digests: List[Tuple[str, str, str]],
+                paper_ids: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        """保存待发送的 (收件人, 主题, 正文)，相同内容只保存一份；paper_ids 为每个收件人本次收到的论文编号"""
+        paper_ids = paper_ids or {}
+        created = datetime.now().strftime('%Y%m%d%H%M%S')
+        # 同一秒内多次写入相同内容（收件人不同）时，用批次后缀区分文件
+        batch = uuid.uuid4().hex[:8]
+        messages = {}
+        for recipient_email, subject, body in digests:
+            digest = hashlib.sha1(f"{subject}\n{body}".encode('utf-8')).hexdigest()[:12]
+            message_id = f"{created}_{digest}_{batch}"
+            message = messages.setdefault(message_id, {
+                'id': message_id,
+                'created': created,
+                'subject': subject,
+                'body': body,
+                'recipients': {},
+            })
+            message['recipients'][recipient_email] = {
+                'status': PENDING,
+                'attempts': 0,
+                'next_attempt': 0,
+                'last_error': None,
+                'paper_ids': paper_ids.get(recipient_email, []),
+            }
+
+        for message_id, message in messages.items():
+            save_json(self._path(message_id), message)
+        logger.info(f"📮 已写入发件箱: {len(messages)} 封邮件, {len(digests)} 位收件人")
+        return list(messages.keys())
+
+    def pending_count(self) -> int:
+        """待发送的收件人数"""
+        return sum(
+            1
+            for message in self._load_all()
+            for state in message['recipients'].values()
+            if state['status'] == PENDING
+        )
+
+    def _next_due(self) -> Optional[float]:
+        """最早的下次重试时间"""
+        due = [
+            state['next_attempt']
+            for message in self._load_all()
+            for state in message['recipients'].values()
+            if state['status'] == PENDING
+        ]
+        return min(due) if due else None
+
+    def flush_once(self, email_sender, force: bool = False) -> Tuple[int, int]:
+        """发送所有到期的待发邮件，返回 (成功数, 失败数)"""
+        now = time.time()
+        messages = [m for m in self._load_all() if any(
+            s['status'] == PENDING and (force or s['next_attempt'] <= now) for s in m['recipients'].values()
+        )]
+        if not messages:
+            return 0, 0
+
+        deliveries = []
+        owners = []
+        for message in messages:
+            built = email_sender.build_message(message['body'], message['subject'])
+            for recipient_email, state in message['recipients'].items():
+                if state['status'] == PENDING and (force or state['next_attempt'] <= now):
+                    deliveries.append((recipient_email, built))
+                    owners.append(message)
+
+        sent, failed = 0, 0
+        delivered = []
+        results = email_sender.deliver(deliveries)
+        for message, (recipient_email, error) in zip(owners, results):
+            state = message['recipients'][recipient_email]
+            state['attempts'] += 1
+            if error is None:
+                state['status'] = SENT
+                state['last_error'] = None
+                delivered.append((recipient_email, state.get('paper_ids', [])))
+                sent += 1
+                continue
+
+            failed += 1
+            state['last_error'] = error
+            if state['attempts'] >= self.max_attempts:
+                state['status'] = FAILED
+                logger.error(f"❌ {recipient_email} 重试 {state['attempts']} 次仍失败，已放弃")
+            else:
+                # 指数退避
+                delay = min(self.retry_delay * 2 ** (state['attempts'] - 1), self.max_retry_delay)
+                state['next_attempt'] = time.time() + delay
+
+        for message in messages:
+            statuses = [s['status'] for s in message['recipients'].values()]
+            if all(status == SENT for status in statuses):
+                os.remove(self._path(message['id']))
+            elif PENDING not in statuses:
+                # 已放弃的邮件移到 failed/，之后的发送不再读取；超过保留期后删除
+                save_json(os.path.join(self.failed_dir, f"{message['id']}.json"), message)
+                os.remove(self._path(message['id']))
+            else:
+                save_json(self._path(message['id']), message)
+        self._prune_failed()
+
+        if delivered and self.on_sent:
+            self.on_sent(delivered)
+        return sent, failed
+
+    def _prune_failed(self):
+        """删除超过保留期的已放弃邮件"""
+        if not self.failed_retention_days or not os.path.isdir(self.failed_dir):
+            return
+        cutoff = time.time() - self.failed_retention_days * 86400
+        for path in glob.glob(os.path.join(self.failed_dir, '*.json')):
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+    def flush(self, email_sender, wait: bool = False, force: bool = False) -> Tuple[int, int]:
+        """发送待发邮件；wait=True 时按退避时间等待并重试，直到全部发送或超过重试次数"""
+        total_sent, total_failed = self.flush_once(email_sender, force=force)
+        while wait:
+            next_due = self._next_due()
+            if next_due is None:
+                break
+            delay = max(0.0, next_due - time.time())
+            logger.info(f"⏳ {self.pending_count()} 封邮件待重试，{delay:.0f} 秒后重试")
+            time.sleep(delay)
+            sent, failed = self.flush_once(email_sender)
+            total_sent += sent
+            total_failed += failed
+
+        remaining = self.pending_count()
+        logger.info(f"发件箱: 本次成功 {total_sent} 封，失败 {total_failed} 次，剩余待发 {remaining} 封")
+        return total_sent, remaining
@@ -2,72 +2,316 @@
 论文筛选模块
 """
 
+import hashlib
+import json
 import logging
-import re
-from typing import List, Dict, Union
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, Union
+
+from utils.metrics import metrics
+from utils.paper_utils import paper_version
 
 logger = logging.getLogger(__name__)
 
 
+def group_fingerprint(keywords: List[str], exclude_keywords: List[str]) -> str:
+    """关键词组配置指纹，配置不变则指纹不变"""
+    payload = json.dumps([keywords, exclude_keywords], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class GroupMatcher:
+    """单个关键词组的预编译匹配器"""
+    
+    def __init__(self, keywords: List[str], exclude_keywords: List[str]):
+        self.keywords = list(keywords)
+        self.exclude_keywords = list(exclude_keywords)
+        self.fingerprint = group_fingerprint(self.keywords, self.exclude_keywords)
+        
+        # 预先转为小写，匹配时不再重复计算
+        self._keywords_lower = [(keyword, keyword.lower()) for keyword in self.keywords]
+        self._exclude_lower = [keyword.lower() for keyword in self.exclude_keywords]
+    
+    def match(self, text_lower: str, title_lower: str) -> Optional[Tuple[int, List[str]]]:
+        """返回 (得分, 命中关键词)，命中排除词时返回None"""
+        # 检查排除关键词
+        if any(keyword in text_lower for keyword in self._exclude_lower):
+            return None
+        
+        # 计算相关性得分
+        score = 0
+        matched_keywords = []
+        for keyword, keyword_lower in self._keywords_lower:
+            if keyword_lower in text_lower:
+                matched_keywords.append(keyword)
+                # 标题匹配权重更高
+                if keyword_lower in title_lower:
+                    score += 3
+                else:
+                    score += 1
+        return score, matched_keywords
+
+
+def compile_group(keywords: List[str], exclude_keywords: List[str],
+                  compiled: Dict[str, GroupMatcher]) -> GroupMatcher:
+    """编译关键词组；compiled 中已有相同指纹的匹配器时直接复用，新编译的匹配器加入其中"""
+    fingerprint = group_fingerprint(keywords, exclude_keywords)
+    matcher = compiled.get(fingerprint)
+    if matcher is None:
+        matcher = GroupMatcher(keywords, exclude_keywords)
+        compiled[fingerprint] = matcher
+    return matcher
+
+
+# 分片筛选的工作进程在初始化时收到一次编译好的匹配器，之后每个任务只传论文标题和摘要
+_worker_matchers: List[GroupMatcher] = []
+
+
+def _init_worker(matchers: List[GroupMatcher]):
+    global _worker_matchers
+    _worker_matchers = matchers
+
+
+def _match_texts(texts: List[Tuple[str, str]]) -> List[Dict[int, Optional[List]]]:
+    """在工作进程中匹配一个分片
+
+    为减少进程间传输，每篇论文只返回 {组序号: [得分, 命中关键词] 或 None(命中排除词)}，得分为0的组省略
+    """
+    results = []
+    for title, abstract in texts:
+        text_lower = f"{title} {abstract}".lower()
+        title_lower = title.lower()
+        sparse = {}
+        for index, matcher in enumerate(_worker_matchers):
+            result = matcher.match(text_lower, title_lower)
+            if result is None:
+                sparse[index] = None
+            elif result[0]:
+                sparse[index] = list(result)
+        results.append(sparse)
+    return results
+
+
 class PaperFilter:
     """论文筛选器"""
     
+    # filter_papers 每批读取的论文数，输入为磁盘上的 PaperSpool 时只有一批在内存中
+    BATCH_SIZE = 1000
+    # 分片筛选时每个任务的论文数，论文数不超过一个分片时不启动进程池
+    SHARD_SIZE = 2000
+    
     def __init__(
-        self, 
+        self,
         keywords: Union[Dict[str, List[str]], Dict[str, List[List[str]]]],
         global_keywords: List[str] = None,
-        global_exclude_keywords: List[str] = None
+        global_exclude_keywords: List[str] = None,
+        cache=None
     ):
+        # cache 为可选的 FilterCache，按论文版本和组指纹复用历史匹配结果
+        self.cache = cache
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.keywords = {}
+        self.global_keywords = []
+        self.global_exclude_keywords = []
+        self.matchers: Dict[str, GroupMatcher] = {}
+        self.update(keywords, global_keywords, global_exclude_keywords)
+    
+    @staticmethod
+    def _split_group(word_pairs) -> Tuple[List[str], List[str]]:
+        if isinstance(word_pairs[0], list):
+            # pair for [keywords, exclude_words]
+            keywords, exclude_keywords = word_pairs
+        else:
+            # word for [keywords]
+            keywords, exclude_keywords = word_pairs, []
+        return keywords, exclude_keywords
+    
+    def update(
+        self,
+        keywords: Union[Dict[str, List[str]], Dict[str, List[List[str]]]],
+        global_keywords: List[str] = None,
+        global_exclude_keywords: List[str] = None
+    ) -> List[str]:
+        """更新关键词配置，只重新编译发生变化的组，返回变化的组名"""
         self.keywords = keywords
         self.global_keywords = global_keywords or []
         self.global_exclude_keywords = global_exclude_keywords or []
+        
+        # 只从当前配置的匹配器中复用未变化的组，旧配置的匹配器随之释放
+        compiled = {matcher.fingerprint: matcher for matcher in self.matchers.values()}
+        matchers = {}
+        changed = []
+        for group_name, word_pairs in keywords.items():
+            keywords_, exclude_keywords = self._split_group(word_pairs)
+            matcher = compile_group(
+                keywords_ + self.global_keywords,
+                exclude_keywords + self.global_exclude_keywords,
+                compiled,
+            )
+            previous = self.matchers.get(group_name)
+            if previous is None or previous.fingerprint != matcher.fingerprint:
+                changed.append(group_name)
+            matchers[group_name] = matcher
+        
+        removed = [group_name for group_name in self.matchers if group_name not in matchers]
+        self.matchers = matchers
+        return changed + removed
     
-    def filter_papers(self, papers: List[Dict], min_score: float = 1.0, ai_summarizer=None) -> Dict[str, List[Dict]]:
-        """筛选论文"""        
-        filtered_group_papers = {}
+    def match_paper(self, paper: Dict, min_score: float = 1.0,
+                    cached: Optional[Dict[str, Optional[List]]] = None) -> Dict[str, Dict]:
+        """对单篇论文计算各组得分，返回 {组名: 带得分的论文副本}
+
+        cached 为该论文的 {组指纹: 匹配结果}，命中的组不再重新计算，新算出的结果写回其中
+        """
+        matches = {}
+        text_to_check = None
         
-        for paper in papers:
-            for group_name, word_pairs in self.keywords.items():
-                if group_name not in filtered_group_papers:
-                    filtered_group_papers[group_name] = []
-                
-                if isinstance(word_pairs[0], list):
-                    # pair for [keywords, exclude_words]
-                    keywords, exclude_keywords = word_pairs
-                else:
-                    # word for [keywords]
-                    keywords, exclude_keywords = word_pairs, []
-                
-                exclude_keywords_ = exclude_keywords + self.global_exclude_keywords
-                keywords_ = keywords + self.global_keywords
-                
-                # 检查排除关键词
-                text_to_check = f"{paper['title']} {paper['abstract']}".lower()
-                if any(keyword.lower() in text_to_check for keyword in exclude_keywords_):
+        for group_name, matcher in self.matchers.items():
+            if cached is not None and matcher.fingerprint in cached:
+                result = cached[matcher.fingerprint]
+            else:
+                if text_to_check is None:
+                    text_to_check = f"{paper['title']} {paper['abstract']}".lower()
+                    title_lower = paper['title'].lower()
+                result = matcher.match(text_to_check, title_lower)
+                if cached is not None:
+                    cached[matcher.fingerprint] = list(result) if result is not None else None
+            if result is None:
+                continue
+            score, matched_keywords = result
+            
+            # 只保留得分高于阈值的论文,至少在abstract里提到过
+            # 每组保存独立副本，避免一篇论文命中多组时得分互相覆盖
+            if score >= min_score:
+                matches[group_name] = dict(paper, relevance_score=score, matched_keywords=matched_keywords)
+        
+        return matches
+    
+    def match_papers(self, papers: List[Dict], min_score: float = 1.0) -> List[Dict[str, Dict]]:
+        """批量匹配，启用缓存时只计算新论文和配置变化的组"""
+        if self.cache is None:
+            return [self.match_paper(paper, min_score) for paper in papers]
+        
+        keys, cached = self._load_cached(papers)
+        fingerprints = [matcher.fingerprint for matcher in self.matchers.values()]
+        results = []
+        updated = {}
+        for key, paper in zip(keys, papers):
+            entry = cached.setdefault(key, {})
+            size = len(entry)
+            results.append(self.match_paper(paper, min_score, cached=entry))
+            if len(entry) != size:
+                # 重写整行时丢弃已修改或删除的组的旧结果
+                updated[key] = {fp: entry[fp] for fp in fingerprints}
+        self.cache.put_many(updated)
+        return results
+    
+    def _load_cached(self, papers: List[Dict]) -> Tuple[List[str], Dict[str, Dict[str, Optional[List]]]]:
+        """读取一批论文的缓存结果并统计命中的组数，返回 (论文版本号, 缓存结果)"""
+        keys = [paper_version(paper) for paper in papers]
+        cached = self.cache.get_many(set(keys))
+        fingerprints = [matcher.fingerprint for matcher in self.matchers.values()]
+        hits = sum(fp in cached[key] for key in keys if key in cached for fp in fingerprints)
+        self.cache_hits += hits
+        self.cache_misses += len(papers) * len(fingerprints) - hits
+        metrics.inc('filter_cache_hits_total', hits)
+        metrics.inc('filter_cache_misses_total', len(papers) * len(fingerprints) - hits)
+        return keys, cached
+    
+    def _match_sharded(self, papers: Iterable[Dict], min_score: float, workers: int) -> Iterator[List[Dict[str, Dict]]]:
+        """分片到进程池匹配，按输入顺序逐片返回结果
+
+        已全部缓存的论文在本进程中直接取结果，其余论文只把标题和摘要发给工作进程；
+        同时在途的分片不超过 workers 的两倍，内存占用与论文总数无关。
+        """
+        groups = list(self.matchers.items())
+        fingerprints = [matcher.fingerprint for _, matcher in groups]
+        
+        def submit(shard: List[Dict]):
+            keys, cached = self._load_cached(shard) if self.cache is not None else ([None] * len(shard), {})
+            entries = [cached.get(key, {}) for key in keys]
+            missing = [i for i, entry in enumerate(entries) if any(fp not in entry for fp in fingerprints)]
+            future = pool.submit(_match_texts, [(shard[i]['title'], shard[i]['abstract']) for i in missing])
+            return shard, keys, entries, missing, future
+        
+        def collect(shard, keys, entries, missing, future) -> List[Dict[str, Dict]]:
+            computed = dict(zip(missing, future.result()))
+            if self.cache is not None:
+                self.cache.put_many({
+                    keys[i]: {fp: sparse.get(index, [0, []]) for index, fp in enumerate(fingerprints)}
+                    for i, sparse in computed.items()
+                })
+            results = []
+            for i, paper in enumerate(shard):
+                sparse = computed.get(i)
+                if sparse is None:
+                    results.append(self.match_paper(paper, min_score, cached=entries[i]))
                     continue
-                
-                # 计算相关性得分
-                score = 0
-                matched_keywords = []
-                
-                for keyword in keywords_:
-                    if keyword.lower() in text_to_check:
-                        matched_keywords.append(keyword)
-                        # 标题匹配权重更高
-                        if keyword.lower() in paper['title'].lower():
-                            score += 3
-                        else:
-                            score += 1
-                
-                # 只保留得分高于阈值的论文,至少在abstract里提到过
-                if score >= min_score:
-                    paper['relevance_score'] = score
-                    paper['matched_keywords'] = matched_keywords
-                    filtered_group_papers[group_name].append(paper)
+                results.append({
+                    groups[index][0]: dict(paper, relevance_score=result[0], matched_keywords=result[1])
+                    for index, result in sparse.items() if result is not None and result[0] >= min_score
+                })
+            return results
+        
+        # spawn 启动的子进程不继承日志等后台线程的锁
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=([matcher for _, matcher in groups],)) as pool:
+            pending = deque()
+            iterator = iter(papers)
+            while True:
+                shard = list(islice(iterator, self.SHARD_SIZE))
+                if shard:
+                    pending.append(submit(shard))
+                    if len(pending) < workers * 2:
+                        continue
+                if not pending:
+                    return
+                yield collect(*pending.popleft())
+    
+    def filter_papers(self, papers: Iterable[Dict], min_score: float = 1.0, ai_summarizer=None,
+                      workers: int = 1, top_k: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """筛选论文，papers 可以是列表或 PaperSpool，按批流式读取
+
+        workers > 1 且论文数超过一个分片时，分片到多个进程并行匹配，结果与单进程相同；
+        top_k 为每组只保留的最高分论文数，各分片的结果合并时即截断，为None时保留全部
+        """
+        filtered_group_papers = {group_name: [] for group_name in self.matchers}
+        matched_counts = {group_name: 0 for group_name in self.matchers}
+        hits, misses = self.cache_hits, self.cache_misses
+        
+        def rank(group_papers: List[Dict]) -> List[Dict]:
+            # 稳定排序，同分论文保持输入顺序
+            group_papers.sort(key=lambda x: x['relevance_score'], reverse=True)
+            return group_papers[:top_k] if top_k else group_papers
+        
+        if workers > 1 and len(papers) > self.SHARD_SIZE:
+            logger.info(f"分片筛选: {len(papers)} 篇论文, {workers} 个进程")
+            batches = self._match_sharded(papers, min_score, workers)
+        else:
+            iterator = iter(papers)
+            batches = (self.match_papers(batch, min_score)
+                       for batch in iter(lambda: list(islice(iterator, self.BATCH_SIZE)), []))
+        
+        for batch_matches in batches:
+            for matches in batch_matches:
+                for group_name, matched_paper in matches.items():
+                    filtered_group_papers[group_name].append(matched_paper)
+                    matched_counts[group_name] += 1
+            if top_k:
+                for group_name, group_papers in filtered_group_papers.items():
+                    if len(group_papers) > 2 * top_k:
+                        filtered_group_papers[group_name] = rank(group_papers)
         
         # 按得分排序
         for group_name in filtered_group_papers.keys():
-            filtered_group_papers[group_name].sort(key=lambda x: x['relevance_score'], reverse=True)
-            logger.info(f"{group_name}类别中筛选出 {len(filtered_group_papers[group_name])} 篇相关论文")
-            
+            filtered_group_papers[group_name] = rank(filtered_group_papers[group_name])
+            kept = f"，保留前 {top_k} 篇" if top_k and matched_counts[group_name] > top_k else ''
+            logger.info(f"{group_name}类别中筛选出 {matched_counts[group_name]} 篇相关论文{kept}")
+        if self.cache is not None:
+            logger.info(f"筛选缓存命中 {self.cache_hits - hits}/{self.cache_hits - hits + self.cache_misses - misses} 组结果")
+        
         return filtered_group_papers
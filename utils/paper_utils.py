@@ -0,0 +1,48 @@
+"""
+论文通用工具
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Tuple
+
+# 新格式 2410.12345v2，旧格式 cs/0112017v1
+ARXIV_ID_PATTERN = re.compile(r'(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(v\d+)?')
+
+
+# 回放录制的请求时把当前时间拨回录制时刻，按发表时间筛选的结果与录制时一致
+_clock_offset = timedelta(0)
+
+
+def utc_now() -> datetime:
+    """当前UTC时间（回放时为录制时刻）"""
+    return datetime.now(timezone.utc) - _clock_offset
+
+
+def set_clock_offset(offset: timedelta):
+    global _clock_offset
+    _clock_offset = offset
+
+
+def parse_arxiv_id(text: str) -> Tuple[str, str]:
+    """从链接或编号中解析 (arXiv编号, 版本号)，版本号可能为空字符串"""
+    match = ARXIV_ID_PATTERN.search(text or '')
+    if not match:
+        return text or '', ''
+    return match.group(1), match.group(2) or ''
+
+
+def paper_id(paper: Dict) -> str:
+    """论文的arXiv编号（不含版本号），无法解析时退回到链接或标题"""
+    if paper.get('arxiv_id'):
+        return paper['arxiv_id']
+    arxiv_id, _ = parse_arxiv_id(paper.get('link', ''))
+    return arxiv_id or paper['title']
+
+
+def paper_version(paper: Dict) -> str:
+    """论文的arXiv编号（含版本号）"""
+    if paper.get('arxiv_id'):
+        return paper['arxiv_id'] + paper.get('version', '')
+    arxiv_id, version = parse_arxiv_id(paper.get('link', ''))
+    return (arxiv_id + version) or paper['title']
@@ -0,0 +1,224 @@
+"""
+流式流水线模块
+"""
+
+import asyncio
+import bisect
+import logging
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Set
+
+from utils.metrics import metrics
+from utils.paper_utils import paper_id
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingPipeline:
+    """asyncio流式流水线：爬取 → 去重 → 筛选 → 预先总结
+
+    各阶段之间用有界队列连接，第一个类别的结果到达后即开始筛选；
+    进入任一订阅当前前K名的论文立即提交总结，总耗时接近最慢的阶段而不是各阶段之和。
+    各阶段记录的耗时为实际工作时间之和，不含等待上游的时间；阶段计时不跨越 await，
+    否则事件循环线程上其他阶段的工作会计入该阶段（--profile 时还会被漏掉）。
+    """
+
+    def __init__(self, crawler, paper_filter, ai_summarizer, subscriptions,
+                 exclude_ids: Dict[str, Set[str]] = None, days_back: int = 1,
+                 queue_size: int = 1000, summary_workers: int = 4, fulltext=None,
+                 on_page: Optional[Callable[[List[Dict]], None]] = None, duplicates=None):
+        self.crawler = crawler
+        self.filter = paper_filter
+        self.ai_summarizer = ai_summarizer
+        self.subscriptions = subscriptions
+        self.exclude_ids = exclude_ids or {}
+        self.days_back = days_back
+        self.queue_size = queue_size
+        self.summary_workers = max(1, summary_workers)
+        # 可选的 FullTextExtractor：提交总结的论文同时在后台提取全文
+        self.fulltext = fulltext
+        # 可选回调：去重后的每页论文（如写入归档）
+        self.on_page = on_page
+        # 可选的 DuplicateTracker：与已提交总结的论文近似重复时不再预先总结
+        self.duplicates = duplicates
+
+        self.crawled_count = 0
+        self.duplicate_count = 0
+        # 每组按 (-得分, 到达顺序) 排序，与顺序模式的稳定排序结果一致
+        self._sort_keys: Dict[str, List] = {}
+        self.filtered_papers: Dict[str, List[Dict]] = {}
+        self.summaries: Dict[str, Dict] = {}
+        self._requested: Set[str] = set()
+        # (组名, 订阅邮箱) -> 该订阅在该组当前前K名的排序键
+        self._top_keys: Dict[tuple, List] = {}
+        self._stopped = threading.Event()
+
+    def run(self) -> Dict[str, List[Dict]]:
+        """运行流水线，返回按得分排序的筛选结果，已总结的论文带有 ai_summary"""
+        return asyncio.run(self._run())
+
+    async def _run(self) -> Dict[str, List[Dict]]:
+        self._sort_keys = {group_name: [] for group_name in self.filter.matchers}
+        self.filtered_papers = {group_name: [] for group_name in self.filter.matchers}
+        self._top_keys = {}
+
+        crawl_queue = asyncio.Queue(maxsize=self.queue_size)
+        filter_queue = asyncio.Queue(maxsize=self.queue_size)
+        summary_queue = asyncio.Queue()
+
+        workers = [asyncio.create_task(self._summarize(summary_queue)) for _ in range(self.summary_workers)]
+        try:
+            await asyncio.gather(
+                self._crawl(crawl_queue),
+                self._dedup(crawl_queue, filter_queue),
+                self._filter(filter_queue, summary_queue),
+            )
+            await summary_queue.join()
+        finally:
+            self._stopped.set()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        for group_papers in self.filtered_papers.values():
+            for paper in group_papers:
+                summary = self.summaries.get(paper_id(paper))
+                if summary is not None:
+                    paper['ai_summary'] = summary
+
+        for group_name, group_papers in self.filtered_papers.items():
+            logger.info(f"{group_name}类别中筛选出 {len(group_papers)} 篇相关论文")
+        logger.info(f"流水线: 爬取 {self.crawled_count} 篇, 重复 {self.duplicate_count} 篇, 预先总结 {len(self.summaries)} 篇")
+        if self.filter.cache is not None:
+            logger.info(f"筛选缓存命中 {self.filter.cache_hits}/{self.filter.cache_hits + self.filter.cache_misses} 组结果")
+        return self.filtered_papers
+
+    async def _crawl(self, out_queue: asyncio.Queue):
+        """爬取阶段：在线程中逐页爬取，每页结果立即送入队列"""
+        loop = asyncio.get_running_loop()
+        errors = []
+
+        def put(item) -> bool:
+            future = asyncio.run_coroutine_threadsafe(out_queue.put(item), loop)
+            while True:
+                try:
+                    future.result(timeout=1)
+                    return True
+                except FutureTimeoutError:
+                    if self._stopped.is_set():
+                        future.cancel()
+                        return False
+
+        def produce():
+            for category in self.crawler.categories:
+                pages = self.crawler.iter_category(category, self.days_back)
+                count = 0
+                try:
+                    while True:
+                        # 在爬取线程中计时和剖析，不含等待下游队列的时间
+                        with metrics.stage('crawl'):
+                            page = next(pages, None)
+                        if page is None:
+                            break
+                        count += len(page)
+                        if not put(page):
+                            return
+                except Exception as e:
+                    logger.error(f"❌ 爬取 {category} 失败: {e}")
+                    errors.append(e)
+                    continue
+                logger.info(f"{category}: 爬取 {count} 篇论文")
+
+        await asyncio.to_thread(produce)
+        await out_queue.put(None)
+        if errors and len(errors) == len(self.crawler.categories):
+            raise RuntimeError(f"所有类别爬取失败: {errors[-1]}")
+
+    async def _dedup(self, in_queue: asyncio.Queue, out_queue: asyncio.Queue):
+        """去重阶段：按arXiv编号去重，按页转发"""
+        seen = set()
+        while True:
+            page = await in_queue.get()
+            if page is None:
+                await out_queue.put(None)
+                return
+            unique = []
+            with metrics.stage('dedup'):
+                for paper in page:
+                    self.crawled_count += 1
+                    key = paper_id(paper)
+                    if key in seen:
+                        self.duplicate_count += 1
+                        continue
+                    seen.add(key)
+                    unique.append(paper)
+            metrics.inc('papers_fetched_total', len(page))
+            metrics.inc('duplicates_total', len(page) - len(unique))
+            if unique and self.on_page is not None:
+                self.on_page(unique)
+            if unique:
+                await out_queue.put(unique)
+
+    async def _filter(self, in_queue: asyncio.Queue, summary_queue: asyncio.Queue):
+        """筛选阶段：按页打分并插入各组有序列表，进入前K名的论文提交总结"""
+        seq = 0
+        while True:
+            page = await in_queue.get()
+            if page is None:
+                return
+            with metrics.stage('filter'):
+                for matches in self.filter.match_papers(page):
+                    seq += 1
+                    for group_name, matched_paper in matches.items():
+                        sort_key = (-matched_paper['relevance_score'], seq)
+                        position = bisect.bisect(self._sort_keys[group_name], sort_key)
+                        self._sort_keys[group_name].insert(position, sort_key)
+                        self.filtered_papers[group_name].insert(position, matched_paper)
+
+                        key = paper_id(matched_paper)
+                        if self._in_any_top_k(group_name, sort_key, key) and key not in self._requested:
+                            self._requested.add(key)
+                            if self.duplicates is not None and self.duplicates.seen(matched_paper):
+                                metrics.inc('near_duplicates_skipped_total')
+                                continue
+                            if self.fulltext is not None:
+                                self.fulltext.prefetch([matched_paper])
+                            summary_queue.put_nowait(matched_paper)
+
+    def _in_any_top_k(self, group_name: str, sort_key: tuple, key: str) -> bool:
+        """论文是否进入任一订阅该组的前K名（不计已发送过的论文）
+
+        每个订阅每组只保留当前前K名的排序键，每次插入的代价只与K有关，与已筛选的论文数无关。
+        """
+        entered = False
+        for sub in self.subscriptions:
+            if sub.groups and group_name not in sub.groups:
+                continue
+            if key in self.exclude_ids.get(sub.email, ()):
+                continue
+            top_keys = self._top_keys.setdefault((group_name, sub.email), [])
+            position = bisect.bisect(top_keys, sort_key)
+            if position < sub.max_papers_per_group:
+                top_keys.insert(position, sort_key)
+                del top_keys[sub.max_papers_per_group:]
+                entered = True
+        return entered
+
+    async def _summarize(self, in_queue: asyncio.Queue):
+        """总结阶段：有界并发调用AI总结"""
+        sections = self.fulltext.sections if self.fulltext is not None else None
+
+        def summarize(paper: Dict) -> Dict:
+            with metrics.stage('summarize'):
+                return self.ai_summarizer.summarize_cached(paper, sections)
+
+        while True:
+            paper = await in_queue.get()
+            try:
+                summary = await asyncio.to_thread(summarize, paper)
+                self.summaries[paper_id(paper)] = summary
+            except Exception as e:
+                logger.error(f"⚠️ 预先总结失败: {e}")
+            finally:
+                in_queue.task_done()
@@ -0,0 +1,158 @@
+"""
+性能剖析模块
+
+run --profile 时对每个阶段（crawl、dedup、filter、near_dup、summarize、render、send）采集 cProfile
+和 tracemalloc 快照，写出各阶段的 .prof 文件（可用 snakeviz、pstats 查看）和文本报告。
+未开启时 Metrics.profiler 为 None，阶段计时不做任何额外工作。
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 快照中忽略的分配来源
+IGNORED_TRACES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+class StageProfile:
+    """一个阶段的剖析结果，同一阶段多次进入时累加"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.stats = None
+        self.allocations: Dict[str, Tuple[int, int]] = {}
+        self.net_bytes = 0
+        self.peak_bytes = 0
+
+    def add(self, profile: Optional[cProfile.Profile], seconds: float, before, after, peak: int):
+        self.calls += 1
+        self.seconds += seconds
+        if profile is not None and self.stats is None:
+            self.stats = pstats.Stats(profile)
+        elif profile is not None:
+            self.stats.add(profile)
+        # 阶段结束时仍存活的分配，按代码行汇总
+        for diff in after.compare_to(before, 'lineno'):
+            if diff.size_diff <= 0:
+                continue
+            line = str(diff.traceback[0])
+            size, count = self.allocations.get(line, (0, 0))
+            self.allocations[line] = (size + diff.size_diff, count + diff.count_diff)
+            self.net_bytes += diff.size_diff
+        self.peak_bytes = max(self.peak_bytes, peak)
+
+
+class StageProfiler:
+    """按阶段采集CPU和内存剖析
+
+    cProfile 只剖析开启它的线程：流式流水线中各阶段在各自的线程里分别剖析；
+    嵌套的阶段计入外层阶段。tracemalloc 的峰值是进程级的，阶段并发时包含其他阶段的分配。
+    """
+
+    def __init__(self, top: int = 20):
+        self.top = top
+        self.stages: Dict[str, StageProfile] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str, **labels):
+        if getattr(self._local, 'active', False):
+            yield
+            return
+        self._local.active = True
+        before = tracemalloc.take_snapshot().filter_traces(IGNORED_TRACES)
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ 同一时刻只能有一个 cProfile，并发的阶段只记录内存
+            profile = None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            after = tracemalloc.take_snapshot().filter_traces(IGNORED_TRACES)
+            self._local.active = False
+            with self._lock:
+                self.stages.setdefault(name, StageProfile()).add(profile, seconds, before, after, peak)
+
+    def report(self) -> str:
+        """各阶段耗时最多的函数和仍存活的最大分配"""
+        lines = []
+        for name, stage in self.stages.items():
+            lines.append('=' * 80)
+            lines.append(f"阶段 {name}: {stage.seconds:.2f}s（{stage.calls} 次），"
+                         f"峰值内存 {stage.peak_bytes / 1024 / 1024:.1f} MB，"
+                         f"结束时新增 {stage.net_bytes / 1024 / 1024:.1f} MB")
+            lines.append('=' * 80)
+
+            if stage.stats is not None:
+                stream = io.StringIO()
+                stage.stats.stream = stream
+                stage.stats.sort_stats('cumulative').print_stats(self.top)
+                lines.append(f"耗时最多的 {self.top} 个函数（按累计耗时）:")
+                lines.append(stream.getvalue().strip())
+
+            lines.append(f"\n结束时仍存活的最大 {self.top} 处分配:")
+            allocations = sorted(stage.allocations.items(), key=lambda item: item[1][0], reverse=True)
+            for line, (size, count) in allocations[:self.top]:
+                lines.append(f"  {size / 1024:>10.1f} KiB  {count:>8} 个对象  {line}")
+            lines.append('')
+        return '\n'.join(lines)
+
+    def save(self, output_dir: str):
+        """写入 <阶段>.prof 和 report.txt"""
+        os.makedirs(output_dir, exist_ok=True)
+        for name, stage in self.stages.items():
+            if stage.stats is not None:
+                stage.stats.dump_stats(os.path.join(output_dir, f"{name}.prof"))
+        report_path = os.path.join(output_dir, 'report.txt')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        logger.info(f"🔬 性能剖析已写入 {output_dir}")
+
+
+@contextmanager
+def profiling(output_dir: str, top: int = 20):
+    """在此范围内剖析各阶段，退出时写入 output_dir/<run_id>/"""
+    profiler = StageProfiler(top)
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    metrics.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        metrics.profiler = None
+        if started_tracing:
+            tracemalloc.stop()
+        if profiler.stages:
+            try:
+                profiler.save(os.path.join(output_dir, metrics.run_id or time.strftime('%Y%m%d-%H%M%S')))
+            except Exception as e:
+                logger.error(f"⚠️ 写入性能剖析失败: {e}")
+        else:
+            logger.info("没有执行任何阶段，未生成性能剖析")
@@ -0,0 +1,64 @@
+"""
+多配置加载模块
+"""
+
+import importlib.util
+import os
+import re
+from typing import List
+
+
+def load_profile(path: str):
+    """按文件路径加载一个配置模块"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(f"arxiv_profile_{name}", path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"无法加载配置文件: {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def profile_paths(value: str) -> List[str]:
+    """解析逗号分隔的配置文件列表"""
+    return [path.strip() for path in (value or '').split(',') if path.strip()]
+
+
+def profile_name(path: str) -> str:
+    """配置名称：配置文件名（不含扩展名）"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def validate_config(cfg) -> List[str]:
+    """检查配置模块，返回错误列表"""
+    errors = []
+    for name in ['ARXIV_CATEGORIES', 'KEYWORDS', 'GLOBAL_EXCLUDE_KEYWORDS',
+                 'MAX_PAPERS_PER_CATEGORY', 'MAX_PAPERS_PER_GROUP', 'DAYS_BACK', 'PROCESS_TIME']:
+        if not hasattr(cfg, name):
+            errors.append(f"缺少配置项 {name}")
+    if errors:
+        return errors
+
+    if not isinstance(cfg.KEYWORDS, dict) or not cfg.KEYWORDS:
+        errors.append("KEYWORDS 必须是非空字典")
+    else:
+        for group_name, word_pairs in cfg.KEYWORDS.items():
+            if not isinstance(word_pairs, list) or not word_pairs:
+                errors.append(f"关键词组 {group_name} 必须是非空列表")
+            elif isinstance(word_pairs[0], list):
+                if len(word_pairs) != 2 or not all(isinstance(w, str) for words in word_pairs for w in words):
+                    errors.append(f"关键词组 {group_name} 格式应为 [[关键词], [排除词]]")
+            elif not all(isinstance(w, str) for w in word_pairs):
+                errors.append(f"关键词组 {group_name} 只能包含字符串")
+
+    for name in ['ARXIV_CATEGORIES', 'GLOBAL_EXCLUDE_KEYWORDS', 'GLOABL_KEYWORDS']:
+        value = getattr(cfg, name, [])
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            errors.append(f"{name} 必须是字符串列表")
+    if not isinstance(cfg.PROCESS_TIME, str) or not re.fullmatch(r'([01]?\d|2[0-3]):[0-5]\d', cfg.PROCESS_TIME):
+        errors.append(f"PROCESS_TIME 必须是 HH:MM 格式的时间，当前为 {cfg.PROCESS_TIME!r}")
+    for name in ['MAX_PAPERS_PER_CATEGORY', 'MAX_PAPERS_PER_GROUP', 'DAYS_BACK']:
+        value = getattr(cfg, name)
+        if not isinstance(value, int) or value <= 0:
+            errors.append(f"{name} 必须是正整数")
+    return errors
@@ -0,0 +1,342 @@
+"""
+请求录制与回放模块
+
+录制模式把一次运行中所有对外的HTTP请求（arXiv、AI接口）和SMTP交互连同耗时保存到磁盘；
+回放模式由本地替身按原始耗时（或按比例缩放）返回录制的结果，无需网络即可复现整次运行，
+用于离线性能分析和回归测试。
+"""
+
+import base64
+import hashlib
+import logging
+import os
+import shutil
+import smtplib
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from utils import email_sender
+from utils.paper_utils import set_clock_offset
+from utils.storage import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+# 录制时保存、回放时恢复的环境变量（不含密码和密钥）
+RECORDED_ENV = ['EMAIL_HOST', 'EMAIL_PORT', 'EMAIL_USER', 'RECIPIENT_EMAIL', 'OPENAI_API_URL',
+                'MODEL_TYPE', 'USE_AI_SUMMARY', 'ENABLE_THINKING']
+# 回放时需要存在但不会真正使用的凭据
+PLACEHOLDER_ENV = {'EMAIL_PASSWORD': 'replay', 'OPENAI_API_KEY': 'replay'}
+# 响应体已解码，不再保留这些头
+DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+
+def _request_key(method: str, url: str, body) -> str:
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    digest = hashlib.sha1(body or b'').hexdigest()
+    return f"{method} {url} {digest}"
+
+
+def state_dir_for(cassette_path: str) -> str:
+    """录制和回放使用的独立状态目录，不影响正式运行的台账、缓存和发件箱"""
+    return os.path.splitext(cassette_path)[0] + '.state'
+
+
+def reset_state_dir(cassette_path: str) -> str:
+    """清空并返回独立状态目录，每次录制或回放都从相同的空状态开始"""
+    state_dir = state_dir_for(cassette_path)
+    shutil.rmtree(state_dir, ignore_errors=True)
+    return state_dir
+
+
+class Recorder:
+    """录制HTTP和SMTP交互"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.http: List[Dict] = []
+        self.smtp: List[Dict] = []
+        self._lock = threading.Lock()
+        self._original_send = None
+        self._original_factory = None
+
+    def install(self):
+        from requests.adapters import HTTPAdapter
+
+        recorder = self
+        original_send = HTTPAdapter.send
+
+        def send(adapter, request, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                response = original_send(adapter, request, *args, **kwargs)
+                content = response.content
+            except Exception as e:
+                recorder._add_http(request, time.perf_counter() - started, error=e)
+                raise
+            recorder._add_http(request, time.perf_counter() - started, response=response, content=content)
+            return response
+
+        self._original_send = original_send
+        HTTPAdapter.send = send
+        self._original_factory = email_sender.SMTPSession.__dict__['factory']
+        email_sender.SMTPSession.factory = staticmethod(
+            lambda host, port, use_ssl: RecordingSMTP(self, host, port, use_ssl))
+
+    def uninstall(self):
+        from requests.adapters import HTTPAdapter
+
+        HTTPAdapter.send = self._original_send
+        email_sender.SMTPSession.factory = self._original_factory
+
+    def _add_http(self, request, elapsed: float, response=None, content: bytes = b'', error=None):
+        entry = {'key': _request_key(request.method, request.url, request.body), 'elapsed': round(elapsed, 4)}
+        if error is not None:
+            entry['error'] = type(error).__name__
+            entry['message'] = str(error)
+        else:
+            try:
+                entry['body'], entry['encoding'] = content.decode('utf-8'), 'utf-8'
+            except UnicodeDecodeError:
+                entry['body'], entry['encoding'] = base64.b64encode(content).decode('ascii'), 'base64'
+            entry['status'] = response.status_code
+            entry['reason'] = response.reason or ''
+            entry['headers'] = {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS}
+        with self._lock:
+            self.http.append(entry)
+
+    def add_smtp(self, operation: str, elapsed: float, recipient: Optional[str] = None,
+                 size: Optional[int] = None, error: Optional[Exception] = None):
+        entry = {'op': operation, 'elapsed': round(elapsed, 4)}
+        if recipient is not None:
+            entry['recipient'] = recipient
+            entry['size'] = size
+        if error is not None:
+            entry['error'] = type(error).__name__
+            entry['message'] = str(error)
+        with self._lock:
+            self.smtp.append(entry)
+
+    def save(self):
+        save_json(self.path, {
+            'version': 1,
+            'recorded_at': datetime.now(timezone.utc).isoformat(),
+            'env': {name: os.getenv(name) for name in RECORDED_ENV if os.getenv(name) is not None},
+            'http': self.http,
+            'smtp': self.smtp,
+        })
+        logger.info(f"📼 已录制 {len(self.http)} 个HTTP请求、{len(self.smtp)} 个SMTP操作到 {self.path}")
+
+
+class RecordingSMTP:
+    """真实SMTP连接的录制代理"""
+
+    def __init__(self, recorder: Recorder, host: str, port: int, use_ssl: bool):
+        self._recorder = recorder
+        self._server = self._timed('connect', email_sender.open_smtp, host, port, use_ssl)
+
+    def _timed(self, operation: str, fn, *args, recipient: Optional[str] = None, size: Optional[int] = None):
+        started = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self._recorder.add_smtp(operation, time.perf_counter() - started, recipient, size, error=e)
+            raise
+        self._recorder.add_smtp(operation, time.perf_counter() - started, recipient, size)
+        return result
+
+    def starttls(self):
+        return self._timed('starttls', self._server.starttls)
+
+    def login(self, username: str, password: str):
+        return self._timed('login', self._server.login, username, password)
+
+    def sendmail(self, sender: str, recipient: str, message: str):
+        return self._timed('sendmail', self._server.sendmail, sender, recipient, message,
+                           recipient=recipient, size=len(message))
+
+    def quit(self):
+        return self._timed('quit', self._server.quit)
+
+    def close(self):
+        self._server.close()
+
+
+class Player:
+    """从录制文件回放HTTP和SMTP交互
+
+    HTTP请求按 (方法, URL, 请求体摘要) 匹配，相同请求按录制顺序依次返回；
+    邮件按收件人匹配。scale 为耗时缩放比例：1 为原始耗时，0 为不等待。
+    """
+
+    def __init__(self, path: str, scale: float = 1.0):
+        self.path = path
+        self.scale = scale
+        cassette = load_json(path)
+        if cassette is None:
+            raise FileNotFoundError(f"找不到录制文件: {path}")
+        self.cassette = cassette
+
+        self._http: Dict[str, deque] = defaultdict(deque)
+        for entry in cassette['http']:
+            self._http[entry['key']].append(entry)
+        self._smtp: Dict[str, deque] = defaultdict(deque)
+        for entry in cassette['smtp']:
+            self._smtp[entry.get('recipient') or entry['op']].append(entry)
+
+        self.misses: List[str] = []
+        self.delivered: List[str] = []
+        self._lock = threading.Lock()
+        self._original_send = None
+        self._original_factory = None
+        self._original_interval_scale = 1.0
+        self._saved_env: Dict[str, Optional[str]] = {}
+
+    def install(self):
+        from requests.adapters import HTTPAdapter
+        from utils.arxiv_crawler import ArxivCrawler
+
+        self._original_send = HTTPAdapter.send
+        HTTPAdapter.send = lambda adapter, request, *args, **kwargs: self._serve_http(request)
+        self._original_factory = email_sender.SMTPSession.__dict__['factory']
+        email_sender.SMTPSession.factory = staticmethod(lambda host, port, use_ssl: ReplaySMTP(self))
+        # 回放不访问 arXiv，爬虫的请求间隔与录制耗时一样按比例缩放
+        self._original_interval_scale = ArxivCrawler.interval_scale
+        ArxivCrawler.interval_scale = self.scale
+
+        # 恢复录制时的环境和时间，凭据用占位值
+        env = dict(self.cassette.get('env', {}))
+        for name, value in PLACEHOLDER_ENV.items():
+            env.setdefault(name, os.getenv(name) or value)
+        for name, value in env.items():
+            self._saved_env[name] = os.environ.get(name)
+            os.environ[name] = value
+        recorded_at = datetime.fromisoformat(self.cassette['recorded_at'])
+        set_clock_offset(datetime.now(timezone.utc) - recorded_at)
+
+    def uninstall(self):
+        from requests.adapters import HTTPAdapter
+        from utils.arxiv_crawler import ArxivCrawler
+
+        HTTPAdapter.send = self._original_send
+        email_sender.SMTPSession.factory = self._original_factory
+        ArxivCrawler.interval_scale = self._original_interval_scale
+        for name, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        set_clock_offset(timedelta(0))
+
+    def _wait(self, entry: Dict):
+        if self.scale > 0:
+            time.sleep(entry['elapsed'] * self.scale)
+
+    def _next(self, table: Dict[str, deque], key: str) -> Optional[Dict]:
+        with self._lock:
+            if table[key]:
+                return table[key].popleft()
+            self.misses.append(key)
+        return None
+
+    def _serve_http(self, request):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        entry = self._next(self._http, _request_key(request.method, request.url, request.body))
+        if entry is None:
+            logger.error(f"❌ 回放中没有该请求: {request.method} {request.url}")
+            raise requests.exceptions.ConnectionError(f"回放中没有该请求: {request.method} {request.url}")
+        self._wait(entry)
+        if 'error' in entry:
+            raise requests.exceptions.ConnectionError(f"{entry['error']}: {entry['message']}")
+
+        response = requests.models.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason', '')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = (entry['body'].encode('utf-8') if entry['encoding'] == 'utf-8'
+                             else base64.b64decode(entry['body']))
+        response.encoding = 'utf-8' if entry['encoding'] == 'utf-8' else None
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=entry['elapsed'])
+        return response
+
+    def serve_smtp(self, operation: str, recipient: Optional[str] = None):
+        entry = self._next(self._smtp, recipient or operation)
+        if entry is None:
+            # 连接、登录等次数可能因并发数不同而变化，缺少时直接成功
+            if recipient is not None:
+                logger.error(f"❌ 回放中没有发给 {recipient} 的邮件")
+            return
+        self._wait(entry)
+        if 'error' in entry:
+            if entry['error'] == 'SMTPServerDisconnected':
+                raise smtplib.SMTPServerDisconnected(entry['message'])
+            raise smtplib.SMTPException(f"{entry['error']}: {entry['message']}")
+        if recipient is not None:
+            with self._lock:
+                self.delivered.append(recipient)
+
+    def report(self) -> Dict:
+        """回放结果：未匹配的请求和未用到的录制"""
+        unused = sum(len(entries) for entries in self._http.values())
+        unsent = sum(len(entries) for key, entries in self._smtp.items() if '@' in key)
+        return {'misses': list(self.misses), 'unused_http': unused, 'unsent_emails': unsent,
+                'delivered': len(self.delivered)}
+
+
+class ReplaySMTP:
+    """回放用的SMTP替身"""
+
+    def __init__(self, player: Player):
+        self._player = player
+        player.serve_smtp('connect')
+
+    def starttls(self):
+        self._player.serve_smtp('starttls')
+
+    def login(self, username: str, password: str):
+        self._player.serve_smtp('login')
+
+    def sendmail(self, sender: str, recipient: str, message: str):
+        self._player.serve_smtp('sendmail', recipient)
+
+    def quit(self):
+        self._player.serve_smtp('quit')
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def recording(path: str):
+    """在此范围内录制所有HTTP和SMTP交互，退出时写入 path"""
+    recorder = Recorder(path)
+    recorder.install()
+    try:
+        yield recorder
+    finally:
+        recorder.uninstall()
+        recorder.save()
+
+
+@contextmanager
+def replaying(path: str, scale: float = 1.0, strict: bool = True):
+    """在此范围内用录制文件回放HTTP和SMTP交互；strict 时有未匹配的请求则抛出 RuntimeError"""
+    player = Player(path, scale)
+    player.install()
+    try:
+        yield player
+    finally:
+        player.uninstall()
+        report = player.report()
+        logger.info(f"📼 回放完成: 发送 {report['delivered']} 封邮件，未匹配请求 {len(report['misses'])} 个，"
+                    f"未使用的HTTP录制 {report['unused_http']} 个")
+    if strict and player.misses:
+        raise RuntimeError(f"回放与录制不一致，{len(player.misses)} 个请求未匹配: {player.misses[0]}")
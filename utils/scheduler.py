@@ -0,0 +1,221 @@
+"""
+定时调度模块
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from utils.storage import load_json, save_json
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class RunLock:
+    """跨进程运行锁，防止同时有两个任务在运行"""
+
+    def __init__(self, path: str = 'output/run.lock'):
+        self.path = path
+        self._fd = None
+        self._thread_lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """非阻塞获取锁，已被占用时返回False"""
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        try:
+            if fcntl is not None:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    os.close(fd)
+                    self._thread_lock.release()
+                    return False
+            else:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL)
+        except OSError:
+            self._thread_lock.release()
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        else:
+            os.close(self._fd)
+            os.remove(self.path)
+        self._fd = None
+        self._thread_lock.release()
+
+
+class PrefetchScheduler:
+    """事件驱动的预取调度器
+
+    根据最近几次准备阶段（爬取、筛选、总结）的耗时提前开始准备，
+    到 PROCESS_TIME 准时发送邮件；启动时补跑错过的任务。
+    """
+
+    # 等待时每次最多睡眠的秒数，便于及时发现系统休眠或时钟调整
+    MAX_SLEEP = 60
+
+    def __init__(
+        self,
+        prepare: Callable[[str], bool],
+        deliver: Callable[[str], bool],
+        process_time: str,
+        history_path: str = 'output/schedule_history.json',
+        prefetch: bool = True,
+        default_lead_minutes: float = 60,
+        min_lead_minutes: float = 5,
+        max_lead_minutes: float = 12 * 60,
+        safety_factor: float = 1.5,
+        catch_up_hours: float = 12,
+        retry_minutes: float = 5,
+    ):
+        self.prepare = prepare
+        self.deliver = deliver
+        self.process_time = process_time
+        self.history_path = history_path
+        self.prefetch = prefetch
+        self.default_lead = default_lead_minutes * 60
+        self.min_lead = min_lead_minutes * 60
+        self.max_lead = max_lead_minutes * 60
+        self.safety_factor = safety_factor
+        self.catch_up = timedelta(hours=catch_up_hours)
+        self.retry_delay = retry_minutes * 60
+
+        self.history = load_json(history_path, default={'last_target': None, 'durations': []})
+        self._stop = threading.Event()
+        self._reschedule = threading.Event()
+
+    def _target_on(self, day: datetime) -> datetime:
+        hour, minute = (int(x) for x in self.process_time.split(':')[:2])
+        return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    def next_target(self, now: Optional[datetime] = None) -> datetime:
+        """下一次发送时间"""
+        now = now or datetime.now()
+        target = self._target_on(now)
+        return target if target > now else target + timedelta(days=1)
+
+    def missed_target(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """错过且仍在补跑窗口内的发送时间
+
+        没有历史记录时（首次启动）不补跑：之前的推送可能已由旧的定时任务完成，
+        只把最近一次发送时间记为已完成，之后按正常调度运行。
+        """
+        now = now or datetime.now()
+        target = self._target_on(now)
+        if target > now:
+            target -= timedelta(days=1)
+        last = self.history.get('last_target')
+        if last is None:
+            self._record(target, None)
+            return None
+        if datetime.fromisoformat(last) >= target:
+            return None
+        return target if now - target <= self.catch_up else None
+
+    def estimate_lead(self) -> float:
+        """根据最近的准备耗时估计需要提前的秒数"""
+        if not self.prefetch:
+            return 0.0
+        durations: List[float] = self.history.get('durations', [])
+        if not durations:
+            return self.default_lead
+        lead = max(durations) * self.safety_factor
+        return min(max(lead, self.min_lead), self.max_lead)
+
+    def _wait_until(self, moment: datetime, reschedulable: bool = False) -> bool:
+        """等待到指定时间；被停止或（reschedulable时）发送时间被修改时返回False"""
+        while not self._stop.is_set():
+            if reschedulable and self._reschedule.is_set():
+                return False
+            remaining = (moment - datetime.now()).total_seconds()
+            if remaining <= 0:
+                return True
+            self._stop.wait(min(remaining, self.MAX_SLEEP))
+        return False
+
+    def _record(self, target: datetime, duration: Optional[float]):
+        self.history['last_target'] = target.isoformat()
+        if duration is not None:
+            self.history['durations'] = (self.history.get('durations', []) + [round(duration, 1)])[-7:]
+        save_json(self.history_path, self.history)
+
+    def run_once(self, target: datetime, prepare_first: bool = True):
+        """为一次发送执行准备和投递"""
+        run_id = target.strftime('%Y%m%d-%H%M%S')
+        duration = None
+
+        if prepare_first:
+            logger.info(f"⏱️ 开始准备 {target:%Y-%m-%d %H:%M} 的推送 (运行ID: {run_id})")
+            started = time.time()
+            prepared = self.prepare(run_id)
+            duration = time.time() - started
+            logger.info(f"准备阶段耗时 {duration:.0f} 秒")
+            if not prepared:
+                logger.error("❌ 准备阶段失败，将在发送时间重试整个任务")
+
+        if not self._wait_until(target):
+            return
+        logger.info(f"📤 到达发送时间 {target:%Y-%m-%d %H:%M}，开始发送")
+        # 发送失败或其他任务占用运行锁时按退避重试，直到超出补跑窗口；只有发送成功才记为完成
+        delay = self.retry_delay
+        while not self.deliver(run_id):
+            retry_at = datetime.now() + timedelta(seconds=delay)
+            if retry_at - target > self.catch_up:
+                logger.error(f"❌ {target:%Y-%m-%d %H:%M} 的推送未能完成（发送失败或有其他任务在运行），"
+                             f"已超出补跑窗口，放弃；可运行 `python arxiv_robot.py resume` 手动恢复")
+                return
+            logger.warning(f"⚠️ {target:%Y-%m-%d %H:%M} 的推送未完成（发送失败或有其他任务在运行），"
+                           f"{delay / 60:.0f} 分钟后重试")
+            if not self._wait_until(retry_at):
+                return
+            delay = min(delay * 2, self.catch_up.total_seconds())
+        self._record(target, duration)
+
+    def run_forever(self):
+        """调度主循环"""
+        missed = self.missed_target()
+        if missed is not None:
+            logger.warning(f"⚠️ 检测到错过的任务 ({missed:%Y-%m-%d %H:%M})，立即补跑")
+            self.run_once(missed)
+
+        while not self._stop.is_set():
+            self._reschedule.clear()
+            target = self.next_target()
+            lead = self.estimate_lead()
+            start = target - timedelta(seconds=lead)
+            logger.info(f"下次推送: {target:%Y-%m-%d %H:%M}，预计提前 {lead / 60:.0f} 分钟开始准备")
+
+            if not self._wait_until(start, reschedulable=True):
+                continue
+            self.run_once(target, prepare_first=self.prefetch)
+
+    def update_process_time(self, process_time: str):
+        """修改发送时间，等待中的调度立即按新时间重新计算，历史记录保持不变"""
+        if process_time != self.process_time:
+            logger.info(f"发送时间修改为 {process_time}")
+            self.process_time = process_time
+            self._reschedule.set()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,45 @@
+"""
+已发送论文记录模块
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Set, Tuple
+
+from utils.storage import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+
+class SentLedger:
+    """已发送论文台账：记录每个收件人已收到的arXiv编号，跨天去重"""
+
+    def __init__(self, path: str = 'output/sent_ledger.json', retention_days: int = 30):
+        self.path = path
+        self.retention_days = retention_days
+        # {recipient: {arxiv_id: 'YYYY-MM-DD'}}
+        self.entries: Dict[str, Dict[str, str]] = load_json(path, default={})
+
+    def seen(self, recipient: str) -> Set[str]:
+        """收件人已收到的论文编号"""
+        return set(self.entries.get(recipient, {}))
+
+    def record(self, deliveries: List[Tuple[str, List[str]]]):
+        """记录成功送达的 (收件人, 论文编号列表) 并落盘"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        for recipient, arxiv_ids in deliveries:
+            recipient_entries = self.entries.setdefault(recipient, {})
+            for arxiv_id in arxiv_ids:
+                recipient_entries[arxiv_id] = today
+        self.prune()
+        save_json(self.path, self.entries)
+
+    def prune(self):
+        """清理超过保留天数的记录"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        for recipient in list(self.entries):
+            kept = {k: v for k, v in self.entries[recipient].items() if v >= cutoff}
+            if kept:
+                self.entries[recipient] = kept
+            else:
+                del self.entries[recipient]
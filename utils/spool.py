@@ -0,0 +1,131 @@
+"""
+论文缓冲模块
+
+爬取结果按编码后的字节数计入内存上限，超过上限后全部转存到临时文件，之后的论文直接追加到文件。
+每条记录为 4 字节长度前缀 + 紧凑JSON，读取时逐条解码，可反复遍历，内存占用与时间窗口大小无关。
+"""
+
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+
+# 读取临时文件时每次读入的字节数
+READ_CHUNK = 1024 * 1024
+
+
+class PaperSpool:
+    """有内存上限的论文列表，支持 append、extend、len 和反复遍历
+
+    memory_limit 为内存中记录的字节数上限，为 None 时从不转存。
+    临时文件创建后即从目录中删除，进程退出或 close() 时自动释放。
+    """
+
+    def __init__(self, memory_limit: Optional[int] = None, spill_dir: Optional[str] = None):
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self._records: List[bytes] = []
+        self._memory_bytes = 0
+        self._file = None
+        self._file_bytes = 0
+        self._appending = True
+        self._count = 0
+
+    @staticmethod
+    def _encode(paper: Dict) -> bytes:
+        return json.dumps(paper, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def append(self, paper: Dict):
+        record = self._encode(paper)
+        self._count += 1
+        if self._file is not None:
+            self._write(record)
+            return
+        self._records.append(record)
+        self._memory_bytes += sys.getsizeof(record)
+        if self.memory_limit is not None and self._memory_bytes > self.memory_limit:
+            self._spill()
+
+    def extend(self, papers: Iterable[Dict]):
+        for paper in papers:
+            self.append(paper)
+
+    def _spill(self):
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        self._file = tempfile.TemporaryFile(dir=self.spill_dir, prefix='papers_')
+        for record in self._records:
+            self._write(record)
+        logger.info(f"💾 爬取结果超过内存上限 {self.memory_limit / 1024 / 1024:.0f} MB，"
+                    f"已转存 {len(self._records)} 篇论文到磁盘")
+        self._records = []
+        self._memory_bytes = 0
+
+    def _write(self, record: bytes):
+        if not self._appending:
+            self._file.seek(0, os.SEEK_END)
+            self._appending = True
+        self._file.write(HEADER.pack(len(record)))
+        self._file.write(record)
+        self._file_bytes += HEADER.size + len(record)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Dict]:
+        if self._file is None:
+            for record in self._records:
+                yield json.loads(record)
+            return
+
+        # 按各自的偏移量分块读取，遍历期间可以继续追加或同时进行其他遍历
+        self._file.flush()
+        end = self._file_bytes
+        offset = 0
+        buffer = b''
+        position = 0
+        while True:
+            if len(buffer) - position >= HEADER.size:
+                start = position + HEADER.size
+                length = HEADER.unpack_from(buffer, position)[0]
+                if len(buffer) - start >= length:
+                    yield json.loads(buffer[start:start + length])
+                    position = start + length
+                    continue
+            if offset >= end:
+                if position < len(buffer):
+                    raise IOError("论文缓冲文件不完整")
+                return
+            self._appending = False
+            self._file.seek(offset)
+            chunk = self._file.read(min(READ_CHUNK, end - offset))
+            offset += len(chunk)
+            buffer = buffer[position:] + chunk
+            position = 0
+
+    def close(self):
+        """释放临时文件和内存中的记录"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._records = []
+        self._memory_bytes = 0
+        self._file_bytes = 0
+        self._count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,95 @@
+"""
+本地状态存储模块
+"""
+
+import json
+import os
+import tempfile
+from typing import Any, Iterable, Iterator
+
+# 逐条读取JSON数组时每次读入的字符数
+READ_CHUNK = 1024 * 1024
+
+
+def load_json(path: str, default: Any = None) -> Any:
+    """读取JSON文件，不存在时返回默认值"""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(path: str, data: Any):
+    """原子写入JSON文件，写入中途崩溃不会留下损坏的文件"""
+    save_text(path, json.dumps(data, ensure_ascii=False))
+
+
+def save_json_items(path: str, items: Iterable):
+    """逐条写入JSON数组，不在内存中拼接整个文件；同样为原子写入"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for i, item in enumerate(items):
+                if i:
+                    f.write(', ')
+                f.write(json.dumps(item, ensure_ascii=False))
+            f.write(']')
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def iter_json_items(path: str) -> Iterator[Any]:
+    """逐条读取JSON数组（如 save_json_items 写入的文件），不把整个数组读入内存"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(READ_CHUNK).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} 不是JSON数组")
+        position = 1
+        eof = False
+        while True:
+            # 跳过空白和分隔符
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(READ_CHUNK)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            # 数字等可能被块边界截断，确认其后还有内容再返回
+            if end == len(buffer) and not eof:
+                chunk = f.read(READ_CHUNK)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield item
+            position = end
+
+
+def save_text(path: str, text: str):
+    """原子写入文本文件"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,74 @@
+"""
+订阅模块
+"""
+
+import logging
+from typing import List, Dict, Optional, Set, Tuple
+
+from utils.paper_utils import paper_id
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """订阅：一个收件人订阅的关键词组及每组论文上限"""
+
+    def __init__(self, email: str, groups: Optional[List[str]] = None, max_papers_per_group: int = 10):
+        self.email = email
+        # None 表示订阅全部关键词组
+        self.groups = list(groups) if groups else None
+        self.max_papers_per_group = max_papers_per_group
+
+    @property
+    def digest_key(self) -> Tuple:
+        """相同 key 的订阅内容完全相同，可以共用一次渲染"""
+        return (tuple(self.groups) if self.groups else None, self.max_papers_per_group)
+
+    def select(self, filtered_papers: Dict[str, List[Dict]],
+               exclude_ids: Optional[Set[str]] = None) -> Dict[str, List[Dict]]:
+        """从共享的筛选结果中选出本订阅的论文（已按得分排序），跳过已发送过的论文及其近似重复"""
+        exclude_ids = exclude_ids or set()
+        group_names = self.groups if self.groups else list(filtered_papers.keys())
+        selection = {}
+        for group_name in group_names:
+            unseen = (p for p in filtered_papers.get(group_name, [])
+                      if paper_id(p) not in exclude_ids and p.get('duplicate_of') not in exclude_ids)
+            selection[group_name] = [p for _, p in zip(range(self.max_papers_per_group), unseen)]
+        return selection
+
+    def __repr__(self):
+        return f"Subscription({self.email}, groups={self.groups}, max={self.max_papers_per_group})"
+
+
+def load_subscriptions(
+    recipients: List[str],
+    subscriptions: Dict[str, Dict],
+    all_groups: List[str],
+    default_max_papers: int
+) -> List[Subscription]:
+    """根据 RECIPIENT_EMAIL 和 SUBSCRIPTIONS 配置生成订阅列表"""
+    subscriptions = subscriptions or {}
+    result = []
+
+    # 配置了订阅的收件人在前，其余收件人默认订阅全部关键词组
+    emails = list(subscriptions.keys()) + [r for r in recipients if r not in subscriptions]
+    for email in emails:
+        options = subscriptions.get(email) or {}
+        groups = options.get('groups')
+
+        if groups:
+            unknown = [g for g in groups if g not in all_groups]
+            if unknown:
+                logger.warning(f"⚠️ {email} 订阅了不存在的关键词组: {unknown}")
+            groups = [g for g in groups if g in all_groups]
+            if not groups:
+                logger.warning(f"⚠️ {email} 没有有效的订阅关键词组，已跳过")
+                continue
+
+        result.append(Subscription(
+            email=email,
+            groups=groups,
+            max_papers_per_group=options.get('max_papers_per_group', default_max_papers),
+        ))
+
+    return result